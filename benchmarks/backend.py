@@ -0,0 +1,79 @@
+import asyncio
+import datetime
+import itertools
+from collections import Counter
+from typing import Any, AsyncGenerator
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod, SendMessage, EditMessageText, EditMessageReplyMarkup
+from aiogram.types import Update, Message, Chat, User, CallbackQuery
+
+BENCH_TOKEN = '42:benchmark'
+
+
+class SimulatedSession(BaseSession):
+    def __init__(self, latency: float = 0.0, *, record: bool = True):
+        super().__init__()
+        self.latency = latency
+        self.record = record
+        self.calls: list[tuple[str, dict[str, Any]]] = []
+
+        self._message_ids = itertools.count(1_000_000)
+
+    @property
+    def total_calls(self) -> int:
+        return len(self.calls)
+
+    @property
+    def counts(self) -> Counter[str]:
+        return Counter(method for method, _ in self.calls)
+
+    def reset(self):
+        self.calls.clear()
+
+    async def close(self):
+        pass
+
+    async def stream_content(self, url: str, headers: dict[str, Any] | None = None, timeout: int = 30,
+                             chunk_size: int = 65536, raise_for_status: bool = True) -> AsyncGenerator[bytes, None]:
+        yield b''
+
+    async def make_request(self, bot: Bot, method: TelegramMethod[Any], timeout: int | None = None) -> Any:
+        if self.record:
+            # a shallow field dict, a full model_dump would add to the measured time
+            self.calls.append((type(method).__name__, dict(method)))
+        await asyncio.sleep(self.latency)
+
+        if isinstance(method, SendMessage):
+            return Message(message_id=next(self._message_ids), date=_now(), text=method.text,
+                           chat=Chat(id=method.chat_id, type='private'))
+        if isinstance(method, (EditMessageText, EditMessageReplyMarkup)):
+            return Message(message_id=method.message_id, date=_now(), text=getattr(method, 'text', None),
+                           chat=Chat(id=method.chat_id, type='private'))
+        return True
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+class UpdateFactory:
+    def __init__(self):
+        self._ids = itertools.count(1)
+
+    @staticmethod
+    def _user(chat_id: int) -> User:
+        return User(id=chat_id, is_bot=False, first_name='bench')
+
+    def message(self, chat_id: int, text: str) -> Update:
+        return Update(update_id=next(self._ids), message=Message(
+            message_id=next(self._ids), date=_now(), text=text,
+            chat=Chat(id=chat_id, type='private'), from_user=self._user(chat_id),
+        ))
+
+    def callback(self, chat_id: int, data: str, message_id: int = 1) -> Update:
+        return Update(update_id=next(self._ids), callback_query=CallbackQuery(
+            id=str(next(self._ids)), chat_instance=str(chat_id), data=data, from_user=self._user(chat_id),
+            message=Message(message_id=message_id, date=_now(), text='menu', chat=Chat(id=chat_id, type='private')),
+        ))
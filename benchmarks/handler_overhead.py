@@ -0,0 +1,70 @@
+import asyncio
+import inspect
+import time
+from dataclasses import dataclass
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from tgutils.context import Context
+
+ROUNDS = 100_000
+
+
+@dataclass
+class BenchContext(Context):
+    counter: int = 0
+
+
+async def handler(ctx: BenchContext, event: object, state: FSMContext):
+    return ctx
+
+
+async def handler_varkw(ctx: BenchContext, event: object, **kwargs):
+    return ctx
+
+
+def _aiogram_like_kwargs(fsm: FSMContext) -> dict[str, object]:
+    kwargs: dict[str, object] = {f'extra_{i}': i for i in range(16)}
+    kwargs.update(state=fsm, raw_state=None, bot=None, event_chat=None, event_from_user=None, handler=None)
+    return kwargs
+
+
+def _legacy_resolve(fn, kwargs: dict[str, object]) -> dict[str, object]:
+    spec = inspect.getfullargspec(fn)
+    params = {*spec.args, *spec.kwonlyargs}
+    return {key: kwargs[key] for key in params if key in kwargs}
+
+
+async def _measure(name: str, call, baseline: float | None = None) -> float:
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        await call()
+    per_call = (time.perf_counter() - started) / ROUNDS * 1e6
+    overhead = '' if baseline is None else f' (+{per_call - baseline:.2f} us)'
+    print(f'{name:<28} {per_call:8.2f} us/call{overhead}')
+    return per_call
+
+
+async def main():
+    storage = MemoryStorage()
+    fsm = FSMContext(storage, StorageKey(bot_id=0, chat_id=1, user_id=1))
+    kwargs = _aiogram_like_kwargs(fsm)
+    ctx = BenchContext()
+    Context.__init__(ctx)
+    await fsm.set_data({BenchContext._id(): ctx.snapshot()})
+
+    bind = Context._kwargs_binder(handler)
+    bind_varkw = Context._kwargs_binder(handler_varkw)
+    injected = BenchContext.inject(handler)
+
+    direct = await _measure('direct call', lambda: handler(ctx, None, state=fsm))
+    await _measure('getfullargspec per call', lambda: handler(ctx, None, **_legacy_resolve(handler, kwargs)), direct)
+    await _measure('precomputed binder', lambda: handler(ctx, None, **bind(kwargs)), direct)
+    await _measure('precomputed binder, **kw', lambda: handler_varkw(ctx, None, **bind_varkw(kwargs)), direct)
+    await _measure('full inject wrapper', lambda: injected(None, **kwargs), direct)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,173 @@
+from dataclasses import dataclass, field
+from typing import Callable, Iterator
+
+from aiogram import Router, F
+from aiogram.filters import Command
+from aiogram.fsm.state import StatesGroup, State
+from aiogram.types import Message, CallbackQuery, Update
+
+from tgutils.consts.aliases import Button, KeyboardBuilder
+from tgutils.context import Context
+from tgutils.context.types import Response
+from tgutils.pages.paginator import HorizontalPaginator, VerticalPaginator
+
+from benchmarks.backend import UpdateFactory
+
+MENU_DEPTH = 8
+CATALOGUE = [f'item #{i}' for i in range(200)]
+
+
+class ItemList(HorizontalPaginator[str]):
+    def make_button(self, item: str) -> Button:
+        return Button(text=item, callback_data=f'pick:{item}')
+
+
+class ItemGrid(VerticalPaginator[str]):
+    def make_button(self, item: str) -> Button:
+        return Button(text=item, callback_data=f'pick:{item}')
+
+
+@dataclass
+class BenchContext(Context):
+    visits: int = 0
+    list_pages: ItemList = field(default_factory=lambda: ItemList(8, CATALOGUE))
+    grid_pages: ItemGrid = field(default_factory=lambda: ItemGrid(6, 3, CATALOGUE))
+
+
+class BenchState(StatesGroup):
+    LIST = State()
+    GRID = State()
+
+
+LEVELS = [State(f'level_{depth}', 'BenchState') for depth in range(MENU_DEPTH)]
+_DEPTHS = {level.state: depth for depth, level in enumerate(LEVELS)}
+
+
+def _level_menu(depth: int) -> Callable[[BenchContext], Response]:
+    def menu(ctx: BenchContext) -> Response:
+        keyboard = KeyboardBuilder()
+        keyboard.row(Button(text='Deeper', callback_data='deeper'))
+        keyboard.row(ctx.menu_button(ctx.Action.BACK), ctx.menu_button(ctx.Action.FINISH))
+        return Response(text=f'Level {depth}, visit {ctx.visits}', markup=keyboard.as_markup())
+
+    return menu
+
+
+for _depth, _level in enumerate(LEVELS):
+    BenchContext.register(_level)(_level_menu(_depth))
+
+
+@BenchContext.register(BenchState.LIST)
+def list_menu(ctx: BenchContext) -> Response:
+    keyboard = KeyboardBuilder()
+    ctx.list_pages.to_builder(keyboard)
+    keyboard.row(ctx.menu_button(ctx.Action.BACK), ctx.menu_button(ctx.Action.FINISH))
+    return Response(text='Catalogue', markup=keyboard.as_markup())
+
+
+@BenchContext.register(BenchState.GRID)
+def grid_menu(ctx: BenchContext) -> Response:
+    keyboard = KeyboardBuilder()
+    ctx.grid_pages.to_builder(keyboard)
+    keyboard.row(ctx.menu_button(ctx.Action.BACK), ctx.menu_button(ctx.Action.FINISH))
+    return Response(text='Catalogue grid', markup=keyboard.as_markup())
+
+
+@BenchContext.entry_point
+async def handle_start(ctx: BenchContext, message: Message):
+    await ctx.advance(LEVELS[0], message.reply, cause=message)
+
+
+@BenchContext.inject
+async def handle_deeper(ctx: BenchContext, query: CallbackQuery, raw_state: str | None):
+    ctx.visits += 1
+    depth = _DEPTHS.get(raw_state, -1) + 1
+    await ctx.advance(LEVELS[min(depth, MENU_DEPTH - 1)], ctx.senders.EDIT)
+
+
+@BenchContext.inject
+async def handle_list(ctx: BenchContext, message: Message):
+    await ctx.advance(BenchState.LIST)
+
+
+@BenchContext.inject
+async def handle_grid(ctx: BenchContext, message: Message):
+    await ctx.advance(BenchState.GRID)
+
+
+@BenchContext.inject
+async def handle_list_page(ctx: BenchContext, query: CallbackQuery):
+    ctx.list_pages.advance(query)
+    await ctx.advance(BenchState.LIST)
+
+
+@BenchContext.inject
+async def handle_grid_page(ctx: BenchContext, query: CallbackQuery):
+    ctx.grid_pages.advance(query)
+    await ctx.advance(BenchState.GRID)
+
+
+def build_router() -> Router:
+    router = Router()
+    router.message.register(handle_start, Command('start'))
+    router.message.register(handle_list, F.text == 'list')
+    router.message.register(handle_grid, F.text == 'grid')
+    router.callback_query.register(handle_deeper, F.data == 'deeper')
+    router.callback_query.register(handle_list_page, ItemList.navigation_filter())
+    router.callback_query.register(handle_grid_page, ItemGrid.navigation_filter())
+    BenchContext.prepare(router)
+    return router
+
+
+def _menu(action: Context.Action) -> str:
+    return BenchContext.menu_button(action).callback_data
+
+
+def deep_navigation(updates: UpdateFactory, chats: int, rounds: int) -> Iterator[Update]:
+    for _ in range(rounds):
+        for chat_id in range(1, chats + 1):
+            yield updates.message(chat_id, '/start')
+            for _ in range(MENU_DEPTH - 1):
+                yield updates.callback(chat_id, 'deeper')
+            for _ in range(MENU_DEPTH - 1):
+                yield updates.callback(chat_id, _menu(Context.Action.BACK))
+
+
+def page_flipping(updates: UpdateFactory, chats: int, rounds: int) -> Iterator[Update]:
+    forward, backward = ItemList._packed(7), ItemList._packed(-7)
+    down, up = ItemGrid._packed(15), ItemGrid._packed(-15)
+    for chat_id in range(1, chats + 1):
+        yield updates.message(chat_id, '/start')
+        yield updates.message(chat_id, 'list')
+    for _ in range(rounds):
+        for chat_id in range(1, chats + 1):
+            for _ in range(10):
+                yield updates.callback(chat_id, forward)
+            for _ in range(10):
+                yield updates.callback(chat_id, backward)
+    for chat_id in range(1, chats + 1):
+        yield updates.callback(chat_id, _menu(Context.Action.BACK))
+        yield updates.message(chat_id, 'grid')
+    for _ in range(rounds):
+        for chat_id in range(1, chats + 1):
+            for _ in range(10):
+                yield updates.callback(chat_id, down)
+            for _ in range(10):
+                yield updates.callback(chat_id, up)
+
+
+def mass_cleanup(updates: UpdateFactory, chats: int, rounds: int) -> Iterator[Update]:
+    for _ in range(rounds):
+        for chat_id in range(1, chats + 1):
+            yield updates.message(chat_id, '/start')
+            yield updates.message(chat_id, 'list')
+            yield updates.message(chat_id, 'grid')
+        for chat_id in range(1, chats + 1):
+            yield updates.callback(chat_id, _menu(Context.Action.FINISH))
+
+
+SCENARIOS: dict[str, Callable[[UpdateFactory, int, int], Iterator[Update]]] = {
+    'deep_navigation': deep_navigation,
+    'page_flipping': page_flipping,
+    'mass_cleanup': mass_cleanup,
+}
@@ -0,0 +1,60 @@
+import random
+import string
+import sys
+import time
+
+from tgutils.pages.search import SearchIndex, tokenize
+
+ITEMS = 100_000
+ROUNDS = 20
+
+_WORDS = [''.join(random.Random(seed).choices(string.ascii_lowercase, k=random.Random(-seed).randint(3, 9)))
+          for seed in range(5_000)]
+QUERIES = ['a', _WORDS[0][:2], _WORDS[0], f'{_WORDS[1][:3]} {_WORDS[2][:2]}', 'zzzzzz']
+
+
+def _catalogue(size: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [' '.join(rng.choices(_WORDS, k=3)) + f' #{i}' for i in range(size)]
+
+
+def _linear(items: list[str], query: str) -> list[str]:
+    tokens = tokenize(query)
+    return [item for item in items if all(any(word.startswith(token) for word in tokenize(item)) for token in tokens)]
+
+
+def _timed(call, rounds: int = 1) -> tuple[float, object]:
+    started = time.perf_counter()
+    result = None
+    for _ in range(rounds):
+        result = call()
+    return (time.perf_counter() - started) / rounds * 1e3, result
+
+
+def main():
+    items = _catalogue(ITEMS)
+    build, index = _timed(lambda: SearchIndex(items, str))
+    print(f'build index over {ITEMS} items: {build:.1f} ms')
+
+    extra = _catalogue(1_000, seed=1)
+    started = time.perf_counter()
+    for item in extra:
+        index.items.append(item)
+    index.refresh()
+    print(f'incremental refresh of {len(extra)} items: {(time.perf_counter() - started) * 1e3:.1f} ms')
+
+    for query in QUERIES:
+        index.refresh()
+        cold, view = _timed(lambda: len(index.search(query)))
+        warm, _ = _timed(lambda: len(index.search(query)), ROUNDS)
+        linear, expected = _timed(lambda: _linear(items, query))
+        assert view == len(expected), (query, view, len(expected))
+        positions = index.search(query).positions
+        view_bytes = 0 if positions is None else positions.itemsize * len(positions)
+        copy_bytes = sys.getsizeof(expected)
+        print(f'{query!r:<10} {view:>6} hits  cold {cold:7.2f} ms  cached {warm:7.3f} ms  '
+              f'linear {linear:8.1f} ms  view {view_bytes:>7} B vs copy {copy_bytes:>7} B')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from pathlib import Path
+
+from aiogram import Bot, Dispatcher
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from tgutils.context.metrics import ContextMetrics
+from tgutils.middleware.logging import LoggingMiddleware
+from tgutils.middleware.metrics import InstrumentedStorage
+
+from benchmarks.backend import SimulatedSession, UpdateFactory, BENCH_TOKEN
+from benchmarks.scenarios import SCENARIOS, build_router
+
+RESULTS_FORMAT = 1
+TRACED_UPDATES = 200
+COMPARED_FIELDS = ('updates_per_sec', 'p50_ms', 'p99_ms', 'api_calls_per_update', 'storage_ops_per_update',
+                   'alloc_kib_per_update')
+
+
+@dataclass
+class ScenarioResult:
+    updates: int
+    updates_per_sec: float
+    p50_ms: float
+    p99_ms: float
+    api_calls_per_update: float
+    storage_ops_per_update: float
+    alloc_kib_per_update: float
+    peak_kib: float
+    api_calls: dict[str, int]
+
+
+def _percentile(samples: list[float], percentile: float) -> float:
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100, method='inclusive')[percentile - 1]
+
+
+def _storage_ops(metrics: ContextMetrics) -> int:
+    return sum(series['count'] for series in metrics.storage.snapshot())
+
+
+def _dispatcher(metrics: ContextMetrics, log_updates: bool) -> tuple[Dispatcher, LoggingMiddleware]:
+    dispatcher = Dispatcher(storage=InstrumentedStorage(MemoryStorage(), metrics))
+    dispatcher.include_router(build_router())
+
+    logger = logging.getLogger('benchmarks.updates')
+    logger.propagate = False
+    logger.handlers = [logging.NullHandler()]
+    logger.setLevel(logging.DEBUG if log_updates else logging.INFO)
+    middleware = LoggingMiddleware(logger=logger)
+    dispatcher.update.outer_middleware(middleware)
+    return dispatcher, middleware
+
+
+@dataclass
+class _Run:
+    timings: list[float]
+    session: SimulatedSession
+    metrics: ContextMetrics
+    allocated: int = 0
+    peak: int = 0
+
+
+async def _drive(name: str, chats: int, rounds: int, latency: float, log_updates: bool, trace: bool) -> _Run:
+    metrics = ContextMetrics()
+    dispatcher, middleware = _dispatcher(metrics, log_updates)
+    # recorded calls would be counted as the library's allocations
+    session = SimulatedSession(latency, record=not trace)
+    bot = Bot(BENCH_TOKEN, session=session)
+    updates = list(SCENARIOS[name](UpdateFactory(), chats, rounds))
+    if trace:
+        updates = updates[:TRACED_UPDATES]
+    run = _Run([], session, metrics)
+
+    if trace:
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+    for update in updates:
+        started = time.perf_counter()
+        await dispatcher.feed_update(bot, update)
+        run.timings.append(time.perf_counter() - started)
+    if trace:
+        _, run.peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        # noinspection PyUnboundLocalVariable
+        run.allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename') if stat.size_diff > 0)
+
+    middleware.close()
+    return run
+
+
+async def run_scenario(name: str, chats: int, rounds: int, latency: float, log_updates: bool) -> ScenarioResult:
+    run = await _drive(name, chats, rounds, latency, log_updates, trace=False)
+    # allocations are measured on a separate, shorter pass, tracemalloc would distort the timings
+    traced = await _drive(name, chats, rounds, latency, log_updates, trace=True)
+
+    count = len(run.timings)
+    timings_ms = [timing * 1e3 for timing in run.timings]
+    return ScenarioResult(
+        updates=count,
+        updates_per_sec=count / sum(run.timings),
+        p50_ms=_percentile(timings_ms, 50),
+        p99_ms=_percentile(timings_ms, 99),
+        api_calls_per_update=run.session.total_calls / count,
+        storage_ops_per_update=_storage_ops(run.metrics) / count,
+        alloc_kib_per_update=traced.allocated / 1024 / len(traced.timings),
+        peak_kib=traced.peak / 1024,
+        api_calls=dict(run.session.counts.most_common()),
+    )
+
+
+def _compare(results: dict[str, ScenarioResult], baseline_path: Path):
+    baseline = json.loads(baseline_path.read_text())['scenarios']
+    print(f'\ncompared with {baseline_path}')
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        deltas = []
+        for key in COMPARED_FIELDS:
+            old, new = baseline[name][key], getattr(result, key)
+            change = (new - old) / old * 100 if old else 0.0
+            deltas.append(f'{key} {change:+.1f}%')
+        print(f'{name:<18} ' + '  '.join(deltas))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='Drive tgutils through a simulated Telegram backend')
+    parser.add_argument('scenarios', nargs='*', metavar='scenario', help=f'any of {", ".join(SCENARIOS)}')
+    parser.add_argument('--chats', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=2)
+    parser.add_argument('--latency', type=float, default=0.0, help='simulated Bot API latency, ms')
+    parser.add_argument('--log-updates', action='store_true', help='enable debug update logging')
+    parser.add_argument('--save', type=Path, help='write results to a JSON file')
+    parser.add_argument('--compare', type=Path, help='compare with previously saved results')
+    args = parser.parse_args()
+    if unknown := set(args.scenarios) - set(SCENARIOS):
+        parser.error(f'unknown scenarios: {", ".join(sorted(unknown))}')
+
+    results = {}
+    for name in args.scenarios or SCENARIOS:
+        result = results[name] = await run_scenario(name, args.chats, args.rounds, args.latency / 1e3,
+                                                    args.log_updates)
+        print(f'{name:<18} {result.updates:>6} updates  {result.updates_per_sec:8.0f} upd/s  '
+              f'p50 {result.p50_ms:6.2f} ms  p99 {result.p99_ms:6.2f} ms  '
+              f'api {result.api_calls_per_update:5.2f}/upd  storage {result.storage_ops_per_update:5.2f}/upd  '
+              f'alloc {result.alloc_kib_per_update:6.2f} KiB/upd  peak {result.peak_kib:8.0f} KiB')
+
+    if args.compare is not None:
+        _compare(results, args.compare)
+    if args.save is not None:
+        args.save.write_text(json.dumps({
+            'format': RESULTS_FORMAT,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'parameters': {'chats': args.chats, 'rounds': args.rounds, 'latency_ms': args.latency,
+                           'log_updates': args.log_updates},
+            'scenarios': {name: asdict(result) for name, result in results.items()},
+        }, indent=2))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
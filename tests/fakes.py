@@ -0,0 +1,63 @@
+import datetime
+import itertools
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod, SendMessage, EditMessageText, EditMessageReplyMarkup
+from aiogram.types import Message, Chat, User, Update, CallbackQuery
+
+TOKEN = '42:fake'
+
+
+class FakeSession(BaseSession):
+    def __init__(self):
+        super().__init__()
+        self.calls: list[TelegramMethod] = []
+        self.rate_limited = 0
+        self.retry_after = 1
+        self._message_ids = itertools.count(1000)
+
+    async def close(self):
+        pass
+
+    async def stream_content(self, *args, **kwargs):
+        yield b''
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: int | None = None):
+        self.calls.append(method)
+        if self.rate_limited > 0:
+            self.rate_limited -= 1
+            raise TelegramRetryAfter(method=method, message='Too Many Requests', retry_after=self.retry_after)
+        now = datetime.datetime.now()
+        if isinstance(method, SendMessage):
+            chat = Chat(id=method.chat_id, type='private')
+            return Message(message_id=next(self._message_ids), date=now, chat=chat, text=method.text)
+        if isinstance(method, (EditMessageText, EditMessageReplyMarkup)):
+            chat = Chat(id=method.chat_id, type='private')
+            return Message(message_id=method.message_id, date=now, chat=chat, text=getattr(method, 'text', ''))
+        return True
+
+    def texts(self, chat_id: int) -> list[str]:
+        return [call.text for call in self.calls
+                if isinstance(call, (SendMessage, EditMessageText)) and call.chat_id == chat_id]
+
+
+class Updates:
+    def __init__(self):
+        self._ids = itertools.count(1)
+
+    def message(self, chat_id: int, text: str) -> Update:
+        user = User(id=chat_id, is_bot=False, first_name='user')
+        chat = Chat(id=chat_id, type='private')
+        message = Message(message_id=next(self._ids), date=datetime.datetime.now(), chat=chat, from_user=user,
+                          text=text)
+        return Update(update_id=next(self._ids), message=message)
+
+    def callback(self, chat_id: int, data: str, message_id: int = 1000) -> Update:
+        user = User(id=chat_id, is_bot=False, first_name='user')
+        chat = Chat(id=chat_id, type='private')
+        message = Message(message_id=message_id, date=datetime.datetime.now(), chat=chat, text='menu')
+        query = CallbackQuery(id=str(next(self._ids)), from_user=user, chat_instance='chat', data=data,
+                              message=message)
+        return Update(update_id=next(self._ids), callback_query=query)
@@ -0,0 +1,83 @@
+import asyncio
+from dataclasses import dataclass
+
+import pytest
+from aiogram import Bot, Dispatcher, Router, F
+from aiogram.filters import Command
+from aiogram.fsm.state import StatesGroup, State
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Message
+
+from tgutils.context import Context
+from tgutils.context.errors import HistoricalStateNotFound
+from tgutils.context.types import Response
+
+from tests.fakes import FakeSession, Updates, TOKEN
+
+
+@dataclass
+class FailingContext(Context):
+    n: int = 0
+
+
+class FailingState(StatesGroup):
+    A = State()
+    B = State()
+    C = State()
+
+
+@FailingContext.register(FailingState.A)
+def menu_a(ctx: FailingContext) -> Response:
+    return Response(text=f'A {ctx.n}')
+
+
+@FailingContext.register(FailingState.B)
+def menu_b(ctx: FailingContext) -> Response:
+    return Response(text='B')
+
+
+@FailingContext.entry_point
+async def start(ctx: FailingContext, message: Message):
+    await ctx.advance(FailingState.A, message.reply)
+
+
+@FailingContext.inject
+async def advance_and_fail(ctx: FailingContext, message: Message):
+    ctx.n += 1
+    await ctx.advance(FailingState.B)
+    raise RuntimeError('handler failed')
+
+
+@FailingContext.inject
+async def backoff_to_missing(ctx: FailingContext, message: Message):
+    await ctx.backoff_until(FailingState.C)
+
+
+def _dispatcher() -> Dispatcher:
+    router = Router()
+    router.message.register(start, Command('start'))
+    router.message.register(advance_and_fail, F.text == 'fail')
+    router.message.register(backoff_to_missing, F.text == 'backoff')
+    FailingContext.prepare(router)
+    dispatcher = Dispatcher(storage=MemoryStorage())
+    dispatcher.include_router(router)
+    return dispatcher
+
+
+@pytest.mark.parametrize('text, error', [('fail', RuntimeError), ('backoff', HistoricalStateNotFound)])
+def test_failed_update_stores_nothing(text: str, error: type[Exception]):
+    async def scenario():
+        dispatcher, updates = _dispatcher(), Updates()
+        bot = Bot(TOKEN, session=FakeSession())
+        await dispatcher.feed_update(bot, updates.message(1, '/start'))
+        key = StorageKey(bot_id=bot.id, chat_id=1, user_id=1)
+        before = await dispatcher.storage.get_state(key), await dispatcher.storage.get_data(key)
+        with pytest.raises(error):
+            await dispatcher.feed_update(bot, updates.message(1, text))
+        after = await dispatcher.storage.get_state(key), await dispatcher.storage.get_data(key)
+        return before, after
+
+    before, after = asyncio.run(scenario())
+    assert before[0] == FailingState.A.state
+    assert after == before
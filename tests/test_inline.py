@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+from aiogram.types import InlineQueryResultArticle, InputTextMessageContent
+
+from tgutils.pages.inline import InlineQueryPaginator
+
+CATALOGUE = [f'item {i}' for i in range(45)]
+
+
+class CataloguePaginator(InlineQueryPaginator[str]):
+    def __init__(self, *args, delay: float = 0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.delay = delay
+        self.resolved: list[str] = []
+
+    async def resolve(self, query: str) -> list[str]:
+        self.resolved.append(query)
+        await asyncio.sleep(self.delay)
+        return [item for item in CATALOGUE if query in item]
+
+    def make_result(self, item: str, position: int) -> InlineQueryResultArticle:
+        return InlineQueryResultArticle(id=str(position), title=item,
+                                        input_message_content=InputTextMessageContent(message_text=item))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_pages_follow_next_offset():
+    async def scenario():
+        paginator = CataloguePaginator(20)
+        titles, offset = [], ''
+        while True:
+            results, offset = await paginator.page('item', offset)
+            titles.append([result.title for result in results])
+            if not offset:
+                return titles
+
+    pages = asyncio.run(scenario())
+    assert [len(page) for page in pages] == [20, 20, 5]
+    assert sum(pages, []) == CATALOGUE
+
+
+def test_bad_offset_starts_over():
+    results, offset = asyncio.run(CataloguePaginator(20).page('item', 'garbage'))
+    assert results[0].title == 'item 0'
+    assert offset == '20'
+
+
+def test_results_are_cached_until_ttl():
+    async def scenario():
+        clock = FakeClock()
+        paginator = CataloguePaginator(20, query_ttl=60, clock=clock)
+        await paginator.items('item 1')
+        await paginator.items('  ITEM   1 ')
+        clock.now = 61
+        await paginator.items('item 1')
+        return paginator
+
+    paginator = asyncio.run(scenario())
+    assert paginator.resolved == ['item 1', 'item 1']
+    assert paginator.stats.hits == 1
+    assert paginator.stats.expirations == 1
+
+
+def test_identical_queries_share_resolution():
+    async def scenario():
+        paginator = CataloguePaginator(delay=0.01)
+        results = await asyncio.gather(*(paginator.items('item 4') for _ in range(5)))
+        return paginator, results
+
+    paginator, results = asyncio.run(scenario())
+    assert paginator.resolved == ['item 4']
+    assert all(result == ['item 4', 'item 40', 'item 41', 'item 42', 'item 43', 'item 44'] for result in results)
+
+
+def test_waiters_resolve_after_first_caller_is_cancelled():
+    async def scenario():
+        paginator = CataloguePaginator(delay=0.01)
+        first = asyncio.create_task(paginator.items('item 2'))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(paginator.items('item 2')) for _ in range(2)]
+        await asyncio.sleep(0)
+        first.cancel()
+        results = await asyncio.wait_for(asyncio.gather(*waiters), 1)
+        return paginator, first, results
+
+    paginator, first, results = asyncio.run(scenario())
+    assert first.cancelled()
+    assert results[0] == results[1] == ['item 2', 'item 20', 'item 21', 'item 22', 'item 23', 'item 24',
+                                        'item 25', 'item 26', 'item 27', 'item 28', 'item 29']
+    assert len(paginator.resolved) == 2
+
+
+def test_cancelled_waiter_stays_cancelled():
+    async def scenario():
+        paginator = CataloguePaginator(delay=0.01)
+        first = asyncio.create_task(paginator.items('item 3'))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(paginator.items('item 3'))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return await first
+
+    assert asyncio.run(scenario()) == ['item 3', 'item 30', 'item 31', 'item 32', 'item 33', 'item 34',
+                                       'item 35', 'item 36', 'item 37', 'item 38', 'item 39']
@@ -0,0 +1,19 @@
+from tgutils.middleware.logging import LoggingMiddleware
+
+from tests.fakes import Updates
+
+
+def test_unset_fields_are_left_out():
+    update = Updates().message(5, 'hi')
+    simplified = LoggingMiddleware(background=False)._simplify_object(update, '')
+    assert simplified == {'update_id': 2, 'message': {
+        'message_id': 1, 'chat': {'id': 5, 'type': 'private'}, 'from_user': {'id': 5}, 'text': 'hi',
+    }}
+
+
+def test_keep_none_logs_unset_fields():
+    update = Updates().message(5, 'hi')
+    simplified = LoggingMiddleware(background=False, keep_none=True)._simplify_object(update, '')
+    assert simplified['edited_message'] is None
+    assert simplified['message']['caption'] is None
+    assert 'date' not in simplified['message']
@@ -0,0 +1,123 @@
+import asyncio
+from dataclasses import dataclass, field
+
+from aiogram import Bot, Dispatcher, Router, F
+from aiogram.filters import Command
+from aiogram.fsm.state import StatesGroup, State
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Message
+
+from tgutils.context import Context
+from tgutils.context.types import Response
+
+from tests.fakes import FakeSession, Updates, TOKEN
+
+
+@dataclass
+class MemoContext(Context):
+    n: int = 0
+    tags: list[str] = field(default_factory=list)
+
+
+class MemoState(StatesGroup):
+    START = State()
+    MAIN = State()
+    TAGS = State()
+    BOT = State()
+
+
+renders: list[str] = []
+
+
+@MemoContext.register(MemoState.START, memoize=True)
+def start_menu(ctx: MemoContext) -> Response:
+    renders.append('start')
+    return Response(text=f'start n={ctx.n}')
+
+
+@MemoContext.register(MemoState.MAIN, memoize=True)
+def main_menu(ctx: MemoContext) -> Response:
+    renders.append('main')
+    return Response(text=f'chat {ctx.chat_id} n={ctx.n} last={ctx.last_transition.value}')
+
+
+@MemoContext.register(MemoState.TAGS, memoize=['tags'])
+def tags_menu(ctx: MemoContext) -> Response:
+    renders.append('tags')
+    return Response(text=f'tags {",".join(ctx.tags)}')
+
+
+@MemoContext.register(MemoState.BOT, memoize=True)
+def bot_menu(ctx: MemoContext) -> Response:
+    renders.append('bot')
+    return Response(text=f'bot {ctx._bot.id}')
+
+
+@MemoContext.entry_point
+async def start(ctx: MemoContext, message: Message):
+    await ctx.advance(MemoState.START, message.reply)
+
+
+@MemoContext.inject
+async def redraw(ctx: MemoContext, message: Message):
+    await ctx.advance(MemoState.MAIN)
+
+
+@MemoContext.inject
+async def tag(ctx: MemoContext, message: Message):
+    ctx.tags.append(message.text.removeprefix('tag '))
+    await ctx.advance(MemoState.TAGS)
+
+
+@MemoContext.inject
+async def show_bot(ctx: MemoContext, message: Message):
+    await ctx.advance(MemoState.BOT)
+
+
+def _dispatcher() -> Dispatcher:
+    router = Router()
+    router.message.register(start, Command('start'))
+    router.message.register(redraw, F.text == 'redraw')
+    router.message.register(tag, F.text.startswith('tag '))
+    router.message.register(show_bot, F.text == 'bot')
+    MemoContext.prepare(router)
+    dispatcher = Dispatcher(storage=MemoryStorage())
+    dispatcher.include_router(router)
+    return dispatcher
+
+
+async def _feed(texts: list[tuple[int, str]]) -> FakeSession:
+    MemoContext.responses.invalidate()
+    renders.clear()
+    session = FakeSession()
+    bot = Bot(TOKEN, session=session)
+    dispatcher, updates = _dispatcher(), Updates()
+    for chat_id, text in texts:
+        await dispatcher.feed_update(bot, updates.message(chat_id, text))
+    return session
+
+
+def test_chats_do_not_share_responses():
+    session = asyncio.run(_feed([(111, '/start'), (111, 'redraw'), (222, '/start'), (222, 'redraw')]))
+    assert session.texts(111) == ['start n=0', 'chat 111 n=0 last=advance']
+    assert session.texts(222) == ['start n=0', 'chat 222 n=0 last=advance']
+    assert renders == ['start', 'main', 'main']
+
+
+def test_history_is_part_of_the_key():
+    session = asyncio.run(_feed([(111, '/start'), (111, 'redraw'), (111, 'redraw')]))
+    assert session.texts(111)[1:] == ['chat 111 n=0 last=advance', 'chat 111 n=0 last=hold']
+    assert renders.count('main') == 2
+
+
+def test_declared_fields_are_cached_per_chat():
+    session = asyncio.run(_feed([(111, '/start'), (111, 'tag a'), (222, '/start'), (222, 'tag a'),
+                                 (111, 'tag b')]))
+    assert session.texts(111)[1:] == ['tags a', 'tags a,b']
+    assert session.texts(222)[1:] == ['tags a']
+    assert renders.count('tags') == 3
+
+
+def test_untracked_reads_are_not_memoized():
+    asyncio.run(_feed([(111, '/start'), (111, 'bot'), (111, 'redraw'), (111, 'bot')]))
+    assert renders.count('bot') == 2
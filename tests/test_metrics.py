@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+
+from tgutils.context.metrics import ContextMetrics
+from tgutils.middleware.metrics import MetricsMiddleware
+
+from tests.fakes import FakeSession, Updates, TOKEN
+
+
+async def greet(message: Message):
+    pass
+
+
+def _feed(register) -> ContextMetrics:
+    metrics = ContextMetrics()
+    router = Router()
+    router.message.register(greet)
+    dispatcher = Dispatcher()
+    dispatcher.include_router(router)
+    register(dispatcher, router, MetricsMiddleware(metrics))
+    asyncio.run(dispatcher.feed_update(Bot(TOKEN, session=FakeSession()), Updates().message(1, 'hi')))
+    return metrics
+
+
+def test_inner_middleware_labels_handlers():
+    metrics = _feed(lambda dispatcher, router, middleware: router.message.middleware(middleware))
+    assert [series['labels']['handler'] for series in metrics.handlers.snapshot()] == ['greet']
+
+
+def test_outer_middleware_fails_fast():
+    with pytest.raises(RuntimeError, match='inner middleware'):
+        _feed(lambda dispatcher, router, middleware: dispatcher.update.outer_middleware(middleware))
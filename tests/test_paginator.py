@@ -0,0 +1,81 @@
+import asyncio
+from dataclasses import dataclass, field
+
+from aiogram import Bot, Dispatcher, Router, F
+from aiogram.filters import Command
+from aiogram.fsm.state import StatesGroup, State
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.methods import EditMessageText
+from aiogram.types import Message
+
+from tgutils.consts.aliases import Button, KeyboardBuilder
+from tgutils.context import Context
+from tgutils.context.types import Response
+from tgutils.pages.paginator import AsyncHorizontalPaginator
+from tgutils.pages.source import ListSource, register_source
+
+from tests.fakes import FakeSession, Updates, TOKEN
+
+register_source('test-catalogue', ListSource([f'item {i}' for i in range(30)]))
+
+
+class Catalogue(AsyncHorizontalPaginator[str]):
+    def make_button(self, item: str) -> Button:
+        return Button(text=item, callback_data=f'pick:{item}')
+
+
+@dataclass
+class CatalogueContext(Context):
+    pages: Catalogue = field(default_factory=lambda: Catalogue(3, 'test-catalogue'))
+
+
+class CatalogueState(StatesGroup):
+    LIST = State()
+    DETAILS = State()
+
+
+@CatalogueContext.register(CatalogueState.LIST)
+def list_menu(ctx: CatalogueContext) -> Response:
+    keyboard = KeyboardBuilder()
+    ctx.pages.to_builder(keyboard)
+    keyboard.row(ctx.menu_button(ctx.Action.BACK))
+    return Response(text='catalogue', markup=keyboard.as_markup())
+
+
+@CatalogueContext.register(CatalogueState.DETAILS)
+def details_menu(ctx: CatalogueContext) -> Response:
+    return Response(text='details', markup=KeyboardBuilder().row(ctx.menu_button(ctx.Action.BACK)).as_markup())
+
+
+@CatalogueContext.entry_point
+async def start(ctx: CatalogueContext, message: Message):
+    await ctx.advance(CatalogueState.LIST, message.reply)
+
+
+@CatalogueContext.inject
+async def details(ctx: CatalogueContext, message: Message):
+    await ctx.advance(CatalogueState.DETAILS, ctx.senders.EDIT)
+
+
+def test_async_pages_render_after_restore_and_back():
+    async def scenario():
+        router = Router()
+        router.message.register(start, Command('start'))
+        router.message.register(details, F.text == 'details')
+        CatalogueContext.prepare(router)
+        dispatcher = Dispatcher(storage=MemoryStorage())
+        dispatcher.include_router(router)
+        session, updates = FakeSession(), Updates()
+        bot = Bot(TOKEN, session=session)
+
+        await dispatcher.feed_update(bot, updates.message(1, '/start'))
+        await dispatcher.feed_update(bot, updates.message(1, 'details'))
+        back = CatalogueContext.menu_button(CatalogueContext.Action.BACK).callback_data
+        await dispatcher.feed_update(bot, updates.callback(1, back))
+        return session
+
+    session = asyncio.run(scenario())
+    assert session.texts(1) == ['catalogue', 'details', 'catalogue']
+    edit = session.calls[-1]
+    assert isinstance(edit, EditMessageText)
+    assert [button.text for button in edit.reply_markup.inline_keyboard[0]] == ['item 0']
@@ -0,0 +1,90 @@
+import asyncio
+import multiprocessing
+import queue
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+
+from tgutils.runner.pool import WorkerPool, _serve, chat_of, shard_of
+
+from tests.fakes import FakeSession, TOKEN
+
+
+def _raw(update_id: int, chat_id: int, text: str) -> dict:
+    return {'update_id': update_id, 'message': {
+        'message_id': update_id, 'date': 0, 'text': text, 'chat': {'id': chat_id, 'type': 'private'},
+        'from': {'id': chat_id, 'is_bot': False, 'first_name': 'user'},
+    }}
+
+
+def _echo_worker() -> tuple[Dispatcher, Bot]:
+    router = Router()
+
+    @router.message()
+    async def echo(message: Message):
+        await message.answer(message.text)
+
+    dispatcher = Dispatcher()
+    dispatcher.include_router(router)
+    return dispatcher, Bot(TOKEN, session=FakeSession())
+
+
+def test_chat_of_and_shard_of():
+    assert chat_of(_raw(1, -100, 'hi')) == -100
+    assert chat_of({'update_id': 7, 'callback_query': {'from': {'id': 5}}}) == 5
+    assert {shard_of(chat_id, 4) for chat_id in range(1, 100)} == {0, 1, 2, 3}
+
+
+def test_busy_chat_does_not_stall_others():
+    async def scenario():
+        handled: list[tuple[int, str]] = []
+        release = asyncio.Event()
+        others_done = asyncio.Event()
+
+        def factory() -> tuple[Dispatcher, Bot]:
+            router = Router()
+
+            @router.message()
+            async def record(message: Message):
+                if message.chat.id == 1:
+                    await release.wait()
+                handled.append((message.chat.id, message.text))
+                if sum(chat_id == 2 for chat_id, _ in handled) == 3:
+                    others_done.set()
+
+            dispatcher = Dispatcher()
+            dispatcher.include_router(router)
+            return dispatcher, Bot(TOKEN, session=FakeSession())
+
+        updates, processed = queue.Queue(), multiprocessing.Value('Q', 0)
+        update_ids = iter(range(1, 100))
+        # chat 1 blocks while it has more updates queued than there are slots
+        for text in ('a', 'b', 'c', 'd'):
+            updates.put((1, _raw(next(update_ids), 1, text)))
+        for text in ('x', 'y', 'z'):
+            updates.put((2, _raw(next(update_ids), 2, text)))
+        serving = asyncio.create_task(_serve(factory, updates, processed, 2, 16))
+
+        await asyncio.wait_for(others_done.wait(), 5)
+        assert handled == [(2, 'x'), (2, 'y'), (2, 'z')]
+        release.set()
+        updates.put(None)
+        await asyncio.wait_for(serving, 5)
+        return handled, processed.value
+
+    handled, processed = asyncio.run(scenario())
+    assert [text for chat_id, text in handled if chat_id == 1] == ['a', 'b', 'c', 'd']
+    assert processed == 7
+
+
+def test_pool_processes_every_update():
+    async def source():
+        for update_id in range(1, 41):
+            yield _raw(update_id, update_id % 7 + 1, f'update {update_id}')
+
+    pool = WorkerPool(_echo_worker, workers=2, queue_size=8, in_flight=4)
+    asyncio.run(pool.run(source()))
+    stats = pool.stats
+    assert sum(worker.dispatched for worker in stats) == 40
+    assert sum(worker.processed for worker in stats) == 40
+    assert all(worker.backlog == 0 for worker in stats)
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+
+from tgutils.context.scheduler import SendScheduler
+
+from tests.fakes import FakeSession, TOKEN
+
+
+def _bot() -> tuple[Bot, FakeSession]:
+    session = FakeSession()
+    return Bot(TOKEN, session=session), session
+
+
+def test_retries_after_429():
+    async def scenario():
+        bot, session = _bot()
+        session.rate_limited = 1
+        scheduler = SendScheduler(chat_rate=100, global_rate=100)
+        message = await scheduler.submit(1, lambda: bot.send_message(1, 'hi'))
+        return message, session, scheduler
+
+    message, session, scheduler = asyncio.run(scenario())
+    assert message.text == 'hi'
+    assert len(session.calls) == 2
+    assert scheduler.stats.retried == 1
+
+
+def test_gives_up_after_max_retries():
+    async def scenario():
+        bot, session = _bot()
+        session.rate_limited, session.retry_after = 10, 0
+        scheduler = SendScheduler(chat_rate=100, global_rate=100, max_retries=2)
+        with pytest.raises(TelegramRetryAfter):
+            await scheduler.submit(1, lambda: bot.send_message(1, 'hi'))
+        return session
+
+    assert len(asyncio.run(scenario()).calls) == 3
+
+
+def test_merged_caller_survives_cancelled_owner_while_waiting():
+    async def scenario():
+        bot, session = _bot()
+        scheduler = SendScheduler(chat_rate=20, chat_burst=1, global_rate=100)
+        await scheduler.submit(1, lambda: bot.send_message(1, 'first'))
+        # the chat bucket is empty now, so the owner waits in the rate limiter when it is cancelled
+        owner = asyncio.create_task(scheduler.submit(1, lambda: bot.send_message(1, 'stale'), merge_key='menu'))
+        await asyncio.sleep(0)
+        merged = asyncio.create_task(scheduler.submit(1, lambda: bot.send_message(1, 'fresh'), merge_key='menu'))
+        await asyncio.sleep(0)
+        owner.cancel()
+        message = await asyncio.wait_for(merged, 1)
+        return owner, message, scheduler
+
+    owner, message, scheduler = asyncio.run(scenario())
+    assert owner.cancelled()
+    assert message.text == 'fresh'
+    assert scheduler.stats.merged == 1
+
+
+def test_merged_caller_survives_cancelled_owner_while_sending():
+    async def scenario():
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def first_call():
+            return 'first'
+
+        async def slow_call():
+            started.set()
+            await release.wait()
+            return 'sent'
+
+        scheduler = SendScheduler(chat_rate=20, chat_burst=1, global_rate=100)
+        await scheduler.submit(1, first_call)
+        owner = asyncio.create_task(scheduler.submit(1, slow_call, merge_key='menu'))
+        await asyncio.sleep(0)
+        merged = asyncio.create_task(scheduler.submit(1, slow_call, merge_key='menu'))
+        await started.wait()
+        owner.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return owner, await asyncio.wait_for(merged, 1)
+
+    owner, result = asyncio.run(scenario())
+    assert owner.cancelled()
+    assert result == 'sent'
+
+
+def test_job_is_dropped_when_every_caller_is_cancelled():
+    async def scenario():
+        bot, session = _bot()
+        scheduler = SendScheduler(chat_rate=20, chat_burst=1, global_rate=100)
+        await scheduler.submit(1, lambda: bot.send_message(1, 'first'))
+        callers = [asyncio.create_task(scheduler.submit(1, lambda: bot.send_message(1, 'menu'), merge_key='menu'))
+                   for _ in range(2)]
+        await asyncio.sleep(0)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.sleep(0.1)
+        return session, scheduler
+
+    session, scheduler = asyncio.run(scenario())
+    assert [call.text for call in session.calls] == ['first']
+    assert scheduler.stats.queued == 0
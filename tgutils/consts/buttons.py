@@ -17,6 +17,10 @@ PAGE_UP = emoji.emojize(':up_arrow:', variant='text_type')
 PAGE_DOWN = emoji.emojize(':down_arrow:', variant='text_type')
 PAGE_LEFT = emoji.emojize(':left_arrow:', variant='text_type')
 PAGE_RIGHT = emoji.emojize(':right_arrow:', variant='text_type')
+PAGE_FIRST = emoji.emojize(':last_track_button:', variant='text_type')
+PAGE_LAST = emoji.emojize(':next_track_button:', variant='text_type')
+PAGE_BACKWARD = emoji.emojize(':fast_reverse_button:', variant='text_type')
+PAGE_FORWARD = emoji.emojize(':fast-forward_button:', variant='text_type')
 
 DISABLED = emoji.emojize(':pause_button:', variant='text_type')
 STUB = emoji.emojize(':white_small_square:', variant='text_type')
\ No newline at end of file
@@ -0,0 +1,60 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from aiogram.fsm.storage.base import StorageKey
+
+from tgutils.utils.lru import LRUCache, CacheStats
+
+if TYPE_CHECKING:
+    from tgutils.context.internal import Context
+
+CacheKey = tuple[StorageKey, str]
+
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_CACHE_TTL = 300.0
+
+
+@dataclass
+class CachedContext:
+    context: 'Context'
+    snapshot: dict[str, Any]
+
+    @property
+    def version(self) -> int:
+        return self.snapshot.get('n', 0)
+
+
+class ContextCache:
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE, ttl: float | None = DEFAULT_CACHE_TTL, *,
+                 verify: bool = True):
+        self.verify = verify
+        self._entries: LRUCache[CacheKey, CachedContext] = LRUCache(maxsize, ttl)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._entries.stats
+
+    def get(self, key: CacheKey, version: int | None = None) -> CachedContext | None:
+        entry = self._entries.get(key, count=False)
+        if entry is not None and version is not None and entry.version != version:
+            self._entries.pop(key)
+            self.stats.stale += 1
+            entry = None
+
+        if entry is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return entry
+
+    def put(self, key: CacheKey, context: 'Context', snapshot: dict[str, Any]):
+        self._entries.put(key, CachedContext(context, snapshot))
+
+    def discard(self, key: CacheKey):
+        self._entries.pop(key)
+
+    def clear(self):
+        self._entries.clear()
@@ -30,3 +30,18 @@ class UnboundContextError(ContextException):
 class HistoricalStateNotFound(ContextException):
     def __init__(self, state: State):
         super().__init__(f'State {state} was not found in history during backoff')  # noqa E713
+
+
+class SnapshotError(ContextException):
+    def __init__(self, version: object):
+        super().__init__(f'Unsupported context snapshot version {version}')
+
+
+class MenuPrefixCollisionError(ContextException):
+    def __init__(self, prefix: str, first: type, second: type):
+        super().__init__(f'Menu callback prefix {prefix} is shared by {first.__qualname__} and {second.__qualname__}')
+
+
+class ContextConflictError(ContextException):
+    def __init__(self, cls: type):
+        super().__init__(f'{cls.__qualname__} was modified concurrently by another handler')
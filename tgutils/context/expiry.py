@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from aiogram import Bot
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+
+from tgutils.context.serialization import pack
+from tgutils.utils.messages import delete_messages
+
+if TYPE_CHECKING:
+    from tgutils.context.internal import Context
+
+DEFAULT_CONTEXT_TTL = 24 * 60 * 60
+DEFAULT_SWEEP_INTERVAL = 5 * 60
+
+
+@dataclass
+class _TrackedContext:
+    cls: type['Context']
+    touched: int
+    size: int
+
+
+@dataclass
+class TrackerStats:
+    live: int = 0
+    bytes: int = 0
+    expired: int = 0
+
+
+class ContextTracker:
+    def __init__(self):
+        # only contexts handled by this process since it started are known, the storage itself is never scanned
+        self._contexts: dict[tuple[StorageKey, str], _TrackedContext] = {}
+        self._expired = 0
+
+    def __len__(self) -> int:
+        return len(self._contexts)
+
+    @property
+    def stats(self) -> TrackerStats:
+        return TrackerStats(
+            live=len(self._contexts),
+            bytes=sum(tracked.size for tracked in self._contexts.values()),
+            expired=self._expired,
+        )
+
+    def track(self, key: StorageKey, cls: type['Context'], snapshot: dict[str, Any]):
+        if 's' not in snapshot:
+            self._contexts.pop((key, cls._id()), None)
+            return
+        self._contexts[key, cls._id()] = _TrackedContext(cls, snapshot.get('t', 0), len(pack(snapshot)))
+
+    def idle(self, ttl: float, now: float | None = None) -> list[tuple[StorageKey, type['Context'], int]]:
+        deadline = (time.time() if now is None else now) - ttl
+        return [
+            (key, tracked.cls, tracked.touched)
+            for (key, _), tracked in self._contexts.items()
+            if tracked.touched < deadline
+        ]
+
+    def forget(self, key: StorageKey, cls: type['Context'], *, expired: bool = False):
+        if self._contexts.pop((key, cls._id()), None) is not None and expired:
+            self._expired += 1
+
+
+class ContextSweeper:
+    def __init__(self, storage: BaseStorage, tracker: 'ContextTracker', bot: Bot | None = None, *,
+                 ttl: float = DEFAULT_CONTEXT_TTL, interval: float = DEFAULT_SWEEP_INTERVAL,
+                 delete_menus: bool = False):
+        self.storage = storage
+        self.tracker = tracker
+        self.bot = bot
+        self.ttl = ttl
+        self.interval = interval
+        self.delete_menus = delete_menus and bot is not None
+
+        self._task: asyncio.Task | None = None
+
+    async def _expire(self, key: StorageKey, cls: type['Context'], touched: int) -> bool:
+        data = await self.storage.get_data(key)
+        snapshot = data.get(cls._id())
+        if snapshot is None:
+            self.tracker.forget(key, cls)
+            return False
+        if snapshot.get('t', 0) != touched:
+            # another worker has used the context since we last saw it
+            self.tracker.track(key, cls, snapshot)
+            return False
+
+        ctx = cls.restore(snapshot)
+        if self.delete_menus:
+            for chat_id, message_ids in ctx.menu_messages().items():
+                await delete_messages(self.bot, chat_id, message_ids)
+
+        del data[cls._id()]
+        await self.storage.set_data(key, data)
+        # noinspection PyProtectedMember
+        state = ctx._safe_state()
+        if state is not None and await self.storage.get_state(key) == state:
+            await self.storage.set_state(key, None)
+
+        if cls.cache is not None:
+            cls.cache.discard((key, cls._id()))
+        self.tracker.forget(key, cls, expired=True)
+        return True
+
+    async def sweep(self, now: float | None = None) -> int:
+        expired = 0
+        for key, cls, touched in self.tracker.idle(self.ttl, now):
+            try:
+                expired += await self._expire(key, cls, touched)
+            except Exception as e:
+                logging.warning(f'Failed to expire context {cls.__name__} for {key}: {e}')
+        return expired
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            expired = await self.sweep()
+            if expired > 0:
+                logging.info(f'Expired {expired} idle contexts')
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
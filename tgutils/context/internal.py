@@ -1,59 +1,134 @@
+import asyncio
 import inspect
+import itertools
 import logging
-import uuid
+import random
+import time
 from abc import ABC
-from dataclasses import dataclass
+from collections import deque
+from contextlib import asynccontextmanager, nullcontext
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Callable, Type
+from typing import Callable, Iterable, Type
 
 import aiogram.exceptions as tg_exc
-from aiogram import Router
+from aiogram import Bot, Router
 from aiogram.filters.callback_data import CallbackData
-from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import Message, CallbackQuery, ReplyParameters
 
-from tgutils.consts.aliases import Button
+from tgutils.consts.aliases import Button, Keyboard
 from tgutils.consts.buttons import MENU_UP, MENU_CLOSE
 
+from tgutils.context.cache import ContextCache, CacheKey
+from tgutils.context.expiry import ContextTracker, DEFAULT_CONTEXT_TTL
+from tgutils.context.metrics import ContextMetrics
 from tgutils.context.errors import EmptyContextError, ScopeError, NoResponderFoundError, UnboundContextError, \
-    HistoricalStateNotFound
-from tgutils.context.types import Response, Handler, Sender
+    HistoricalStateNotFound, SnapshotError, MenuPrefixCollisionError, ContextConflictError
+from tgutils.context.locking import ContextLocks
+from tgutils.context.memo import ResponseCache
+from tgutils.context.routing import MenuDispatch, menu_prefix, MENU_SEPARATOR
+from tgutils.context.serialization import SNAPSHOT_VERSION, encode_fields, decode_fields, field_names, pack, unpack
+from tgutils.context.scheduler import SendScheduler, ApiCall
+from tgutils.context.session import FSMSession
+from tgutils.context.types import Response, Handler, Sender, KwargsBinder, Digest, Fragment, Rows
+from tgutils.utils.messages import delete_messages
 
 
 @dataclass
 class _ContextMenu:
-    message: Message
-    state: State
+    chat_id: int
+    message_id: int
+    state: str
     is_new: bool
-    cause: Message | None = None
+    cause_id: int | None = None
+    digest: Digest | None = None
+
+    def pack(self) -> list:
+        packed = [self.chat_id, self.message_id, self.state, int(self.is_new), self.cause_id]
+        if self.digest is not None:
+            packed.extend(self.digest)
+        return packed
+
+    @classmethod
+    def unpack(cls, data: list) -> '_ContextMenu':
+        chat_id, message_id, state, is_new, cause_id, *digest = data
+        return cls(chat_id, message_id, state, bool(is_new), cause_id, tuple(digest) if digest else None)
+
+
+@dataclass
+class _ContextBatch:
+    edits: dict[tuple[int, int], str] = field(default_factory=dict)
+    deletes: dict[int, list[int]] = field(default_factory=dict)
+
+    def delete(self, chat_id: int, message_id: int):
+        self.edits.pop((chat_id, message_id), None)
+        self.deletes.setdefault(chat_id, []).append(message_id)
 
 
 class ContextTransition(Enum):
     ADVANCE = 'advance'
     HOLD = 'hold'
     BACK = 'back'
+    FINISH = 'finish'
+
+    @property
+    def code(self) -> str:
+        return self.value[0]
+
+
+_TRANSITION_CODES = {transition.code: transition for transition in ContextTransition}
+
+
+def _pass_all(kwargs: dict[str, object]) -> dict[str, object]:
+    return kwargs
 
 
 class Context(ABC):
     Responder = Callable[['Context'], Response]
 
     _responders: dict[tuple[type, State], Responder] = {}
+    _fragments: dict[tuple[type, State], tuple[Fragment | None, Fragment | None]] = {}
+    _built_fragments: dict[tuple[type, State], tuple[Rows, Rows]] = {}
+    _memoized: dict[tuple[type, State], tuple[str, ...] | None] = {}
     _callback: dict[type, Type[CallbackData]] = {}
+    _buttons: dict[tuple[type, Enum], Button] = {}
+    _prefixes: dict[str, type] = {}
+
+    cache: ContextCache | None = None
+    scheduler: SendScheduler | None = None
+    tracker: ContextTracker | None = None
+    metrics: ContextMetrics | None = None
+    locks: ContextLocks | None = None
+    responses = ResponseCache()
+
+    pickle_fields = True
+    detect_conflicts = False
+    conflict_retries = 0
+    batch_transitions = True
+    touch_interval: float = DEFAULT_CONTEXT_TTL / 4
+    history_limit: int | None = 100
+    max_depth: int | None = None
 
     def __init__(self):
-        self._fsm: FSMContext | None = None
+        self._fsm: FSMSession | None = None
+        self._bot: Bot | None = None
         self._states_stack: list[_ContextMenu] = []
-        self._history: list[ContextTransition] = []
+        self._history: deque[ContextTransition] = deque(maxlen=self.history_limit)
+        self._version = 0
+        self._touched = 0
+        self._requests = 0
+        self._batch: _ContextBatch | None = None
 
         async def _edit(*args, **kwargs):
-            try:
-                return await self._menu.message.edit_text(*args, **kwargs)
-            except tg_exc.TelegramBadRequest as e:
-                logging.info(f'Bad request trying to edit message: {e}')
+            menu = self._menu
+            return await self._edit_message(menu.chat_id, menu.message_id, *args, **kwargs)
 
         async def _send(*args, **kwargs):
-            return await self._menu.message.reply(*args, **kwargs)
+            menu, bot = self._menu, self._ensure_bot()
+            return await self._submit(menu.chat_id, lambda: bot.send_message(
+                menu.chat_id, *args, reply_parameters=ReplyParameters(message_id=menu.message_id), **kwargs
+            ), sender='new')
 
         class SenderOption(Enum):
             EDIT: Sender = _edit
@@ -62,6 +137,63 @@ class Context(ABC):
         self.senders = SenderOption
         self._default_sender = self.senders.NEW
 
+    async def _request(self, sender: str, call: ApiCall):
+        self._requests += 1
+        # the only place the api metric is taken, so it covers the request alone and not rendering or queueing
+        if self.metrics is None:
+            return await call()
+        with self.metrics.api_calls.time(context=self.__class__.__name__, sender=sender):
+            return await call()
+
+    async def _submit(self, chat_id: int | None, call: ApiCall, merge_key: tuple | None = None, *, sender: str):
+        if self.scheduler is None:
+            return await self._request(sender, call)
+        return await self.scheduler.submit(chat_id, lambda: self._request(sender, call), merge_key=merge_key)
+
+    async def _edit_message(self, chat_id: int, message_id: int, *args, **kwargs) -> Message | bool | None:
+        bot = self._ensure_bot()
+        try:
+            return await self._submit(chat_id, lambda: bot.edit_message_text(
+                *args, chat_id=chat_id, message_id=message_id, **kwargs
+            ), ('text', chat_id, message_id), sender='edit')
+        except tg_exc.TelegramBadRequest as e:
+            logging.info(f'Bad request trying to edit message: {e}')
+
+    async def _edit_markup(self, chat_id: int, message_id: int, markup: Keyboard | None) -> Message | bool | None:
+        bot = self._ensure_bot()
+        try:
+            return await self._submit(chat_id, lambda: bot.edit_message_reply_markup(
+                chat_id=chat_id, message_id=message_id, reply_markup=markup
+            ), ('markup', chat_id, message_id), sender='markup')
+        except tg_exc.TelegramBadRequest as e:
+            logging.info(f'Bad request trying to edit message markup: {e}')
+
+    def _shown_digest(self, chat_id: int, message_id: int) -> Digest | None:
+        for menu in reversed(self._states_stack):
+            if menu.chat_id == chat_id and menu.message_id == message_id:
+                return menu.digest
+        return None
+
+    def _mark_shown(self, chat_id: int, message_id: int, digest: Digest):
+        for menu in self._states_stack:
+            if menu.chat_id == chat_id and menu.message_id == message_id:
+                menu.digest = digest
+
+    async def _apply_edit(self, chat_id: int, message_id: int, response: Response) -> Digest | None:
+        digest = response.digest()
+        shown = self._shown_digest(chat_id, message_id)
+        if shown == digest:
+            return digest
+        if shown is not None and shown[0] == digest[0]:
+            edited = await self._edit_markup(chat_id, message_id, response.markup)
+        else:
+            edited = await self._edit_message(chat_id, message_id, **response.as_kwargs())
+        # a rejected edit leaves the old content, so the next render has to try again
+        if edited is None:
+            return None
+        self._mark_shown(chat_id, message_id, digest)
+        return digest
+
     def set_default(self, sender: Sender):
         self._default_sender = sender
 
@@ -70,18 +202,23 @@ class Context(ABC):
             raise EmptyContextError()
         return self._states_stack
 
-    def _ensure_fsm(self) -> FSMContext:
+    def _ensure_fsm(self) -> FSMSession:
         if self._fsm is None:
             raise ScopeError()
         return self._fsm
 
+    def _ensure_bot(self) -> Bot:
+        if self._bot is None:
+            raise ScopeError()
+        return self._bot
+
     @property
     def _menu(self) -> _ContextMenu:
         return self._ensure_stack()[-1]
 
     @property
     def chat_id(self) -> int:
-        return self._menu.message.chat.id
+        return self._menu.chat_id
 
     @property
     def last_transition(self) -> ContextTransition:
@@ -89,122 +226,390 @@ class Context(ABC):
             return self._history[-1]
         return ContextTransition.HOLD
 
-    def _safe_state(self) -> State | None:
+    def _safe_state(self) -> str | None:
         if len(self._states_stack) == 0:
             return None
         return self._menu.state
 
+    def menu_messages(self) -> dict[int, list[int]]:
+        messages: dict[int, list[int]] = {}
+        for menu in self._states_stack:
+            if not menu.is_new:
+                continue
+            messages.setdefault(menu.chat_id, []).append(menu.message_id)
+            if menu.cause_id is not None:
+                messages[menu.chat_id].append(menu.cause_id)
+        return messages
+
+    def _safe_chat_id(self) -> int | None:
+        if len(self._states_stack) == 0:
+            return None
+        return self._menu.chat_id
+
     def _safe_message_id(self) -> int | None:
         if len(self._states_stack) == 0:
             return None
-        return self._menu.message.message_id
+        return self._menu.message_id
 
     @classmethod
     def _id(cls) -> str:
         return cls.__name__
 
+    def snapshot(self) -> dict[str, object]:
+        plain, coded, pickled = encode_fields(self, allow_pickle=self.pickle_fields)
+        snapshot: dict[str, object] = {'v': SNAPSHOT_VERSION}
+        if plain:
+            snapshot['f'] = plain
+        if coded:
+            snapshot['c'] = coded
+        if pickled:
+            snapshot['p'] = pickled
+        if self._states_stack:
+            snapshot['s'] = [menu.pack() for menu in self._states_stack]
+        if self._history:
+            snapshot['h'] = ''.join(transition.code for transition in self._history)
+        if self._default_sender is self.senders.EDIT:
+            snapshot['d'] = 'e'
+        if self._version != 0:
+            snapshot['n'] = self._version
+        if self._touched != 0:
+            snapshot['t'] = self._touched
+        return snapshot
+
+    @classmethod
+    def restore(cls, snapshot: dict[str, object]) -> 'Context':
+        if snapshot.get('v') != SNAPSHOT_VERSION:
+            raise SnapshotError(snapshot.get('v'))
+
+        # noinspection PyArgumentList
+        ctx = cls()
+        Context.__init__(ctx)
+        decode_fields(ctx, snapshot.get('f', {}), snapshot.get('c', {}), snapshot.get('p', {}),
+                      allow_pickle=cls.pickle_fields)
+        ctx._states_stack = [_ContextMenu.unpack(menu) for menu in snapshot.get('s', ())]
+        ctx._history.extend(_TRANSITION_CODES[code] for code in snapshot.get('h', ''))
+        if snapshot.get('d') == 'e':
+            ctx._default_sender = ctx.senders.EDIT
+        ctx._version = snapshot.get('n', 0)
+        ctx._touched = snapshot.get('t', 0)
+        return ctx
+
+    def dumps(self) -> bytes:
+        return pack(self.snapshot())
+
+    @classmethod
+    def loads(cls, data: bytes | str) -> 'Context':
+        return cls.restore(unpack(data))
+
     @staticmethod
-    def _resolve_kwargs(handler: Handler, kwargs: dict[str, object]):
-        spec = inspect.getfullargspec(handler)
-        params = {*spec.args, *spec.kwonlyargs}
-        return {key: kwargs[key] for key in params if key in kwargs}
+    def _kwargs_binder(handler: Handler) -> KwargsBinder:
+        params = list(inspect.signature(handler).parameters.values())
+        if any(param.kind is inspect.Parameter.VAR_KEYWORD for param in params):
+            return _pass_all
+
+        # the first parameter always receives the context itself
+        names = tuple(
+            param.name for param in params[1:]
+            if param.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)
+        )
+
+        def bind(kwargs: dict[str, object]) -> dict[str, object]:
+            return {name: kwargs[name] for name in names if name in kwargs}
+
+        return bind
 
     @classmethod
-    def _handler_wrapper(cls, ctx: 'Context', fsm: FSMContext, handler: Handler):
-        # noinspection PyProtectedMember
-        async def wrapper(*args, **kwargs):
-            ctx._fsm = fsm
-            result = await handler(ctx, *args, **cls._resolve_kwargs(handler, kwargs))
-            ctx._fsm = None
-            await fsm.update_data({cls._id(): ctx})
-            return result
+    def _cache_key(cls, session: FSMSession) -> CacheKey:
+        return session.fsm.key, cls._id()
 
-        return wrapper
+    @classmethod
+    async def _load(cls, session: FSMSession) -> tuple['Context', dict[str, object]]:
+        cache = cls.cache
+        if cache is not None and not cache.verify:
+            entry = cache.get(cls._cache_key(session))
+            if entry is not None:
+                return entry.context, entry.snapshot
+
+        snapshot = (await session.get_data()).get(cls._id())
+        if snapshot is None:
+            raise EmptyContextError()
+
+        if cache is not None and cache.verify:
+            entry = cache.get(cls._cache_key(session), snapshot.get('n', 0))
+            if entry is not None:
+                return entry.context, entry.snapshot
+        return cls.restore(snapshot), snapshot
+
+    @classmethod
+    @asynccontextmanager
+    async def _serialized(cls, session: FSMSession):
+        if cls.locks is None:
+            yield
+            return
+        async with cls.locks.hold(cls._cache_key(session)) as waited:
+            # whatever was read before the lock, the state prefetched by aiogram included, may already be outdated
+            session.refresh()
+            if cls.metrics is not None:
+                cls.metrics.lock_waits.observe(waited, context=cls.__name__)
+            yield
+
+    @classmethod
+    async def _check_version(cls, session: FSMSession, previous: dict[str, object]):
+        stored = (await session.fetch_data()).get(cls._id())
+        if stored is None or stored.get('n', 0) != previous.get('n', 0):
+            session.discard()
+            if cls.metrics is not None:
+                cls.metrics.conflicts.inc(context=cls.__name__)
+            raise ContextConflictError(cls)
+
+    @classmethod
+    async def _call_handler(cls, ctx: 'Context', session: FSMSession, handler: Handler, bind: KwargsBinder,
+                            args: tuple, kwargs: dict[str, object], previous: dict[str, object] | None = None):
+        ctx._fsm, ctx._bot, ctx._requests = session, kwargs.get('bot'), 0
+        try:
+            async with ctx.batch() if cls.batch_transitions else nullcontext():
+                result = await handler(ctx, *args, **bind(kwargs))
+                if cls.detect_conflicts and previous is not None:
+                    # checked before the batched edits and deletes go out, so a conflicting update can be rerun
+                    await cls._check_version(session, previous)
+            snapshot = ctx.snapshot()
+            changed, now = snapshot != previous, int(time.time())
+            # an unchanged context is still touched now and then, so the sweeper doesn't expire one in use
+            if changed or now - ctx._touched >= cls.touch_interval:
+                if changed:
+                    ctx._version = snapshot['n'] = random.getrandbits(32) or 1
+                ctx._touched = snapshot['t'] = now
+                await session.update_data({cls._id(): snapshot})
+            if cls.cache is not None:
+                cls.cache.put(cls._cache_key(session), ctx, snapshot)
+            if cls.tracker is not None:
+                cls.tracker.track(session.fsm.key, cls, snapshot)
+        except BaseException:
+            # the snapshot isn't written for a failed update, so neither is the state it changed
+            session.discard()
+            if cls.cache is not None:
+                cls.cache.discard(cls._cache_key(session))
+            raise
+        finally:
+            ctx._fsm, ctx._bot = None, None
+            await session.commit()
+        return result
 
     @classmethod
     def entry_point(cls, handler: Handler):
+        bind = cls._kwargs_binder(handler)
+
         async def wrapper(*args, **kwargs):
-            fsm: FSMContext = kwargs['state']
+            session = FSMSession.of(kwargs)
             # noinspection PyArgumentList
             ctx = cls()
             Context.__init__(ctx)
-            await fsm.update_data({cls._id(): ctx})
-            return await cls._handler_wrapper(ctx, fsm, handler)(*args, **kwargs)
+            async with cls._serialized(session):
+                return await cls._call_handler(ctx, session, handler, bind, args, kwargs)
 
+        wrapper.__qualname__ = handler.__qualname__
         return wrapper
 
     @classmethod
     def inject(cls, handler: Handler):
-        async def wrapper(*args, **kwargs):
-            fsm: FSMContext = kwargs['state']
-            ctx = (await fsm.get_data()).get(cls._id())
-            if ctx is None:
-                raise EmptyContextError()
-            return await cls._handler_wrapper(ctx, fsm, handler)(*args, **kwargs)
+        bind = cls._kwargs_binder(handler)
 
+        async def wrapper(*args, **kwargs):
+            session = FSMSession.of(kwargs)
+            async with cls._serialized(session):
+                for attempt in itertools.count():
+                    ctx, snapshot = await cls._load(session)
+                    try:
+                        return await cls._call_handler(ctx, session, handler, bind, args, kwargs, snapshot)
+                    except ContextConflictError:
+                        # an update that already sent something is not run twice
+                        if attempt >= cls.conflict_retries or ctx._requests > 0:
+                            raise
+
+        wrapper.__qualname__ = handler.__qualname__
         return wrapper
 
     @classmethod
-    def register(cls, trigger: State):
+    def register(cls, trigger: State, *, header: Fragment | None = None, footer: Fragment | None = None,
+                 memoize: bool | Iterable[str] = False):
         key = (cls, trigger)
         if (key, trigger) in Context._responders:
             raise AttributeError(f'Duplicate {trigger} trigger for scenario class {cls.__name__}')
 
         def decorator(reply_builder: Context.Responder):
             Context._responders[key] = reply_builder
+            Context._built_fragments.pop(key, None)
+            if header is None and footer is None:
+                Context._fragments.pop(key, None)
+            else:
+                Context._fragments[key] = (header, footer)
+            if memoize is False:
+                Context._memoized.pop(key, None)
+            else:
+                # True tracks the fields the responder reads, a list of names declares them upfront
+                Context._memoized[key] = None if memoize is True else tuple(memoize)
             return reply_builder
 
         return decorator
 
-    async def _close_last_menu(self):
-        while len(self._states_stack) > 0:
-            menu = self._states_stack.pop()
-            if not menu.is_new:
-                continue
-            await menu.message.delete()
-            if menu.cause is not None:
-                await menu.cause.delete()
-        await self._fsm.set_state(self._safe_state())
+    @asynccontextmanager
+    async def batch(self):
+        if self._batch is not None:
+            yield self
+            return
+
+        self._batch = _ContextBatch()
+        try:
+            yield self
+            batch = self._batch
+        finally:
+            self._batch = None
+        await self._flush(batch)
+
+    async def _flush(self, batch: _ContextBatch):
+        if not batch.deletes and not batch.edits:
+            return
+        bot = self._ensure_bot()
+        await asyncio.gather(*(
+            self._request('delete', lambda chat_id=chat_id, message_ids=message_ids: delete_messages(
+                bot, chat_id, message_ids
+            )) for chat_id, message_ids in batch.deletes.items()
+        ))
+        if batch.edits:
+            await self.before_render()
+        for (chat_id, message_id), state in batch.edits.items():
+            await self._apply_edit(chat_id, message_id, self._render(state))
+
+    async def _delete(self, chat_id: int, *message_ids: int):
+        if self._batch is not None:
+            for message_id in message_ids:
+                self._batch.delete(chat_id, message_id)
+        else:
+            bot = self._ensure_bot()
+            await self._request('delete', lambda: delete_messages(bot, chat_id, message_ids))
+
+    def _transition(self, transition: ContextTransition):
+        self._history.append(transition)
+        if self.metrics is not None:
+            self.metrics.transitions.inc(context=self.__class__.__name__, transition=transition.value)
 
     async def _cleanup(self):
-        while len(self._states_stack) > 0:
-            await self._close_last_menu()
+        doomed = self.menu_messages()
+        self._states_stack.clear()
+        self._transition(ContextTransition.FINISH)
+        await self._ensure_fsm().set_state(None)
+        await asyncio.gather(*(self._delete(chat_id, *message_ids) for chat_id, message_ids in doomed.items()))
+
+    @classmethod
+    def _build_fragment(cls, fragment: Fragment | None) -> Rows:
+        if fragment is None:
+            return []
+        return fragment(cls) if callable(fragment) else fragment
+
+    @classmethod
+    def _static_rows(cls, key: tuple[type, State | str]) -> tuple[Rows, Rows] | None:
+        rows = Context._built_fragments.get(key)
+        if rows is None:
+            fragments = Context._fragments.get(key)
+            if fragments is None:
+                return None
+            header, footer = fragments
+            rows = Context._built_fragments[key] = (cls._build_fragment(header), cls._build_fragment(footer))
+        return rows
 
-    async def _fit_message(self, trigger: State, sender: Sender) -> Message:
+    @classmethod
+    def _assemble(cls, key: tuple[type, State | str], response: Response) -> Response:
+        rows = cls._static_rows(key)
+        if rows is None:
+            return response
+        header, footer = rows
+        body = response.markup.inline_keyboard if response.markup is not None else []
+        return Response(text=response.text, markup=Keyboard(inline_keyboard=[*header, *body, *footer]))
+
+    def _respond(self, key: tuple[type, State | str], responder: Responder) -> Response:
+        if key not in Context._memoized:
+            return self._assemble(key, responder(self))
+        return self.responses.render(self, key, lambda ctx: self._assemble(key, responder(ctx)),
+                                     Context._memoized[key])
+
+    def _render(self, trigger: State | str) -> Response:
         key = (self.__class__, trigger)
         responder = Context._responders.get(key)
         if responder is None:
             raise NoResponderFoundError(trigger)
-
-        response = responder(self)
-        return await sender(**response.as_kwargs())
+        if self.metrics is None:
+            return self._respond(key, responder)
+        with self.metrics.responders.time(context=self.__class__.__name__, state=getattr(trigger, 'state', trigger)):
+            return self._respond(key, responder)
+
+    async def before_render(self):
+        # fields backed by async data, like AsyncPaginator, fetch what the next render reads
+        for name in field_names(self.__class__):
+            hook = getattr(getattr(self, name), 'before_render', None)
+            if hook is not None:
+                await hook()
+
+    async def _fit_message(self, trigger: State | str, sender: Sender) -> tuple[int, int, Digest | None]:
+        if sender is self.senders.EDIT and self._batch is not None:
+            menu = self._menu
+            self._batch.edits[menu.chat_id, menu.message_id] = trigger
+            return menu.chat_id, menu.message_id, None
+
+        await self.before_render()
+        if sender is self.senders.EDIT:
+            menu = self._menu
+            digest = await self._apply_edit(menu.chat_id, menu.message_id, self._render(trigger))
+            return menu.chat_id, menu.message_id, digest
+
+        response = self._render(trigger)
+        if sender is self.senders.NEW:
+            msg = await sender(**response.as_kwargs())
+        else:
+            msg = await self._submit(self._safe_chat_id(), lambda: sender(**response.as_kwargs()),
+                                     sender=getattr(sender, '__name__', 'custom'))
+        if isinstance(msg, Message):
+            return msg.chat.id, msg.message_id, response.digest()
+        return self._menu.chat_id, self._menu.message_id, response.digest()
 
     async def advance(self, new_state: State, sender: Sender | None = None, *, cause: Message | None = None):
         if sender is None:
             sender = self._default_sender
         if self._safe_state() == new_state:
             sender = self.senders.EDIT
-            self._history.append(ContextTransition.HOLD)
+            self._transition(ContextTransition.HOLD)
         else:
-            self._history.append(ContextTransition.ADVANCE)
+            self._transition(ContextTransition.ADVANCE)
 
         await self._ensure_fsm().set_state(new_state)
-        msg = await self._fit_message(new_state, sender)
+        chat_id, message_id, digest = await self._fit_message(new_state, sender)
         if self._safe_state() != new_state:
-            is_new = self._safe_message_id() != msg.message_id
-            self._states_stack.append(_ContextMenu(msg, new_state, is_new, cause))
+            is_new = self._safe_message_id() != message_id
+            cause_id = cause.message_id if cause is not None else None
+            self._states_stack.append(_ContextMenu(chat_id, message_id, new_state.state, is_new, cause_id, digest))
+            await self._trim_stack()
+
+    async def _trim_stack(self):
+        if self.max_depth is None:
+            return
+        while len(self._states_stack) > max(self.max_depth, 1):
+            menu, bottom = self._states_stack.pop(0), self._states_stack[0]
+            if bottom.chat_id == menu.chat_id and bottom.message_id == menu.message_id:
+                # the next menu reuses the dropped message, so it inherits the ownership
+                bottom.is_new, bottom.cause_id = menu.is_new, menu.cause_id
+            elif menu.is_new:
+                await self._delete(menu.chat_id, *filter(None, (menu.message_id, menu.cause_id)))
 
     async def back(self):
         menu = self._ensure_stack().pop()
         new_state = self._safe_state()
-        await self._fsm.set_state(new_state)
+        await self._ensure_fsm().set_state(new_state)
         if new_state is None:
             return await self._cleanup()
 
         if menu.is_new:
-            await menu.message.delete()
+            await self._delete(menu.chat_id, menu.message_id)
 
-        self._history.append(ContextTransition.BACK)
+        self._transition(ContextTransition.BACK)
         # noinspection PyTypeChecker
         await self._fit_message(new_state, self.senders.EDIT)
 
@@ -223,12 +628,20 @@ class Context(ABC):
 
     @classmethod
     def prepare(cls, router: Router):
-        class MenuCallback(CallbackData, prefix=f'menu-{uuid.uuid4()}'):
+        prefix = menu_prefix(cls)
+        owner = Context._prefixes.setdefault(prefix, cls)
+        if owner is not cls:
+            raise MenuPrefixCollisionError(prefix, owner, cls)
+
+        class MenuCallback(CallbackData, prefix=prefix, sep=MENU_SEPARATOR):
             action: cls.Action
 
         Context._callback[cls] = MenuCallback
+        for action in cls.Action:
+            Context._buttons[cls, action] = Button(text=action.value, callback_data=MenuCallback(action=action).pack())
+        for key in [key for key in Context._built_fragments if key[0] is cls]:
+            del Context._built_fragments[key]
 
-        @router.callback_query(MenuCallback.filter())
         @cls.inject
         async def handle_callback(ctx: Context, query: CallbackQuery):
             data = MenuCallback.unpack(query.data)
@@ -238,12 +651,15 @@ class Context(ABC):
                 case cls.Action.FINISH: await ctx.finish()
             # formatter:on
 
+        MenuDispatch.attach(router).handlers[prefix] = handle_callback
+
     @classmethod
     def menu_button(cls, action: 'Context.Action') -> Button:
-        if cls not in Context._callback:
+        button = Context._buttons.get((cls, action))
+        if button is None:
             raise UnboundContextError()
+        return button
 
-        return Button(
-            text=action.value,
-            callback_data=Context._callback[cls](action=action).pack(),
-        )
+    @classmethod
+    def menu_row(cls, *actions: 'Context.Action') -> list[Button]:
+        return [cls.menu_button(action) for action in actions]
@@ -0,0 +1,64 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Hashable
+
+
+@dataclass
+class LockStats:
+    acquired: int = 0
+    contended: int = 0
+    waited: float = 0.0
+    longest_wait: float = 0.0
+    peak_keys: int = 0
+
+
+class _KeyLock:
+    __slots__ = ('lock', 'users')
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class ContextLocks:
+    def __init__(self):
+        self.stats = LockStats()
+        # entries only live while someone holds or waits for them, so the table is bounded by in-flight updates
+        self._locks: dict[Hashable, _KeyLock] = {}
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def locked(self, key: Hashable) -> bool:
+        entry = self._locks.get(key)
+        return entry is not None and entry.lock.locked()
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable) -> AsyncIterator[float]:
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = _KeyLock()
+            self.stats.peak_keys = max(self.stats.peak_keys, len(self._locks))
+        entry.users += 1
+        try:
+            waited = 0.0
+            if entry.lock.locked():
+                self.stats.contended += 1
+                started = time.perf_counter()
+                await entry.lock.acquire()
+                waited = time.perf_counter() - started
+                self.stats.waited += waited
+                self.stats.longest_wait = max(self.stats.longest_wait, waited)
+            else:
+                await entry.lock.acquire()
+            self.stats.acquired += 1
+            try:
+                yield waited
+            finally:
+                entry.lock.release()
+        finally:
+            entry.users -= 1
+            if entry.users == 0:
+                del self._locks[key]
@@ -0,0 +1,140 @@
+import inspect
+from types import FunctionType, MethodType
+from typing import TYPE_CHECKING, Any, Callable, Hashable
+
+from tgutils.context.serialization import field_names
+from tgutils.context.types import Response
+from tgutils.utils.lru import LRUCache, CacheStats
+
+if TYPE_CHECKING:
+    from tgutils.context.internal import Context
+
+DEFAULT_RESPONSE_CACHE_SIZE = 512
+
+_MISSING = object()
+# per-chat state a responder may read besides its fields, menus are keyed without digests which change on every send
+_CONTEXT_STATE = {
+    '_states_stack': lambda stack: tuple((menu.chat_id, menu.message_id, menu.state, menu.cause_id) for menu in stack),
+    '_history': tuple,
+}
+
+ResponderKey = tuple[type, Hashable]
+
+
+class _Unkeyable(Exception):
+    pass
+
+
+class _ReadRecorder:
+    __slots__ = ('_ctx', '_fields', 'read', 'untracked')
+
+    def __init__(self, ctx: 'Context', fields: tuple[str, ...]):
+        self._ctx = ctx
+        self._fields = fields
+        self.read: set[str] = set()
+        self.untracked = False
+
+    @property
+    def __class__(self) -> type:
+        return self._ctx.__class__
+
+    def __getattr__(self, name: str) -> Any:
+        if name in self._fields or name in _CONTEXT_STATE:
+            self.read.add(name)
+            return getattr(self._ctx, name)
+        # methods and properties run against the recorder, so the fields they read are tracked as well
+        attr = inspect.getattr_static(self._ctx.__class__, name, _MISSING)
+        if isinstance(attr, FunctionType):
+            return MethodType(attr, self)
+        if isinstance(attr, property) and attr.fget is not None:
+            return attr.fget(self)
+        if name in vars(self._ctx):
+            # any other instance state (bot, storage, senders) can't be keyed, such responders are not memoized
+            self.untracked = True
+        return getattr(self._ctx, name)
+
+
+def _freeze(value: Any) -> Hashable:
+    memo_key = getattr(value, 'memo_key', None)
+    if memo_key is not None:
+        return memo_key
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    try:
+        hash(value)
+    except TypeError:
+        raise _Unkeyable()
+    return value
+
+
+def _dependency_value(ctx: 'Context', name: str) -> Hashable:
+    value = getattr(ctx, name)
+    state = _CONTEXT_STATE.get(name)
+    if state is not None:
+        return state(value)
+    return _freeze(value)
+
+
+class ResponseCache:
+    def __init__(self, maxsize: int = DEFAULT_RESPONSE_CACHE_SIZE):
+        self._entries: LRUCache[tuple, Response] = LRUCache(maxsize)
+        self._tracked: dict[ResponderKey, tuple[str, ...]] = {}
+        self._generations: dict[type, int] = {}
+        self._untracked: set[ResponderKey] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._entries.stats
+
+    def _key(self, ctx: 'Context', key: ResponderKey, names: tuple[str, ...]) -> tuple | None:
+        try:
+            values = tuple(_dependency_value(ctx, name) for name in names)
+        except _Unkeyable:
+            return None
+        # the cache is shared by all chats, so entries never cross them even if the chat id itself is not read
+        return key, self._generations.get(key[0], 0), ctx._safe_chat_id(), names, values
+
+    def render(self, ctx: 'Context', key: ResponderKey, responder: Callable[['Context'], Response],
+               depends: tuple[str, ...] | None) -> Response:
+        if key in self._untracked:
+            return responder(ctx)
+        names = depends if depends is not None else self._tracked.get(key)
+        if names is not None:
+            cache_key = self._key(ctx, key, names)
+            response = self._entries.get(cache_key) if cache_key is not None else None
+            if response is not None:
+                return response
+
+        if depends is None:
+            recorder = _ReadRecorder(ctx, field_names(ctx.__class__))
+            # noinspection PyTypeChecker
+            response = responder(recorder)
+            if recorder.untracked:
+                self._untracked.add(key)
+                self._tracked.pop(key, None)
+                return response
+            names = self._tracked[key] = tuple(sorted(recorder.read.union(self._tracked.get(key, ()))))
+        else:
+            response = responder(ctx)
+        cache_key = self._key(ctx, key, names)
+        if cache_key is not None:
+            self._entries.put(cache_key, response)
+        return response
+
+    def invalidate(self, cls: type | None = None):
+        if cls is None:
+            self._entries.clear()
+            self._tracked.clear()
+            self._untracked.clear()
+            return
+        self._generations[cls] = self._generations.get(cls, 0) + 1
+        for key in [key for key in self._tracked if key[0] is cls]:
+            del self._tracked[key]
+        self._untracked = {key for key in self._untracked if key[0] is not cls}
@@ -0,0 +1,22 @@
+from tgutils.utils.metrics import MetricsRegistry
+
+
+class ContextMetrics:
+    def __init__(self, registry: MetricsRegistry | None = None):
+        self.registry = registry if registry is not None else MetricsRegistry('tgutils')
+
+        self.transitions = self.registry.counter(
+            'context_transitions_total', 'Context transitions by kind', ('context', 'transition'))
+        self.responders = self.registry.histogram(
+            'context_responder_seconds', 'Time spent building responses', ('context', 'state'))
+        self.api_calls = self.registry.histogram(
+            'context_api_call_seconds', 'Bot API calls issued by context senders', ('context', 'sender'))
+        self.handlers = self.registry.histogram(
+            'handler_seconds', 'Update handling latency', ('handler', 'state'))
+        self.lock_waits = self.registry.histogram(
+            'context_lock_wait_seconds', 'Time updates waited for their context lock', ('context',))
+        self.conflicts = self.registry.counter(
+            'context_conflicts_total', 'Concurrent context modifications detected', ('context',))
+        self.storage = self.registry.histogram(
+            'storage_operation_seconds', 'FSM storage operation latency', ('operation',),
+            (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0))
@@ -0,0 +1,47 @@
+import base64
+import hashlib
+from typing import Any
+from weakref import WeakKeyDictionary
+
+from aiogram import Router
+from aiogram.filters import Filter
+from aiogram.types import CallbackQuery
+
+from tgutils.context.types import Handler
+
+MENU_PREFIX = 'm'
+MENU_SEPARATOR = ':'
+
+
+def menu_prefix(cls: type) -> str:
+    name = f'{cls.__module__}.{cls.__qualname__}'.encode('utf-8')
+    digest = hashlib.blake2b(name, digest_size=6).digest()
+    return MENU_PREFIX + base64.urlsafe_b64encode(digest).decode('ascii')
+
+
+class MenuDispatch(Filter):
+    _routers: WeakKeyDictionary[Router, 'MenuDispatch'] = WeakKeyDictionary()
+
+    def __init__(self):
+        self.handlers: dict[str, Handler] = {}
+
+    async def __call__(self, query: CallbackQuery) -> bool | dict[str, Any]:
+        if query.data is None:
+            return False
+        handler = self.handlers.get(query.data.partition(MENU_SEPARATOR)[0])
+        if handler is None:
+            return False
+        return {'menu_handler': handler}
+
+    @classmethod
+    def attach(cls, router: Router) -> 'MenuDispatch':
+        dispatch = cls._routers.get(router)
+        if dispatch is None:
+            dispatch = cls()
+            router.callback_query.register(_dispatch_menu, dispatch)
+            cls._routers[router] = dispatch
+        return dispatch
+
+
+async def _dispatch_menu(query: CallbackQuery, menu_handler: Handler, **kwargs):
+    return await menu_handler(query, **kwargs)
@@ -0,0 +1,126 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable
+
+from aiogram.exceptions import TelegramRetryAfter
+
+from tgutils.utils.lru import LRUCache
+from tgutils.utils.rate import TokenBucket
+
+ApiCall = Callable[[], Awaitable[Any]]
+
+DEFAULT_CHAT_RATE = 1.0
+DEFAULT_CHAT_BURST = 3.0
+DEFAULT_GROUP_RATE = 20 / 60
+DEFAULT_GLOBAL_RATE = 30.0
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_MAX_CHATS = 10_000
+
+
+@dataclass
+class SchedulerStats:
+    submitted: int = 0
+    merged: int = 0
+    retried: int = 0
+    queued: int = 0
+    max_queued: int = 0
+    waits: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        return self.total_wait / self.waits if self.waits > 0 else 0.0
+
+    def record_wait(self, wait: float):
+        self.waits += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+
+@dataclass
+class _Job:
+    call: ApiCall
+    task: asyncio.Task | None = None
+    waiters: int = 0
+
+
+class SendScheduler:
+    def __init__(self, *, chat_rate: float = DEFAULT_CHAT_RATE, chat_burst: float = DEFAULT_CHAT_BURST,
+                 group_rate: float = DEFAULT_GROUP_RATE, global_rate: float = DEFAULT_GLOBAL_RATE,
+                 max_retries: int = DEFAULT_MAX_RETRIES, max_chats: int = DEFAULT_MAX_CHATS):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self.stats = SchedulerStats()
+
+        self._global = TokenBucket(global_rate)
+        self._chats: LRUCache[int, TokenBucket] = LRUCache(max_chats)
+        self._pending: dict[Hashable, _Job] = {}
+
+    def _bucket(self, chat_id: int | None) -> TokenBucket | None:
+        if chat_id is None:
+            return None
+        bucket = self._chats.get(chat_id, count=False)
+        if bucket is None:
+            # negative ids are groups and channels, which have a much stricter per-minute limit
+            rate = self.group_rate if chat_id < 0 else self.chat_rate
+            bucket = TokenBucket(rate, self.chat_burst)
+            self._chats.put(chat_id, bucket)
+        return bucket
+
+    async def _acquire(self, chat_id: int | None):
+        bucket = self._bucket(chat_id)
+        if bucket is not None:
+            await bucket.acquire()
+        await self._global.acquire()
+
+    async def _perform(self, chat_id: int | None, job: _Job) -> Any:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await job.call()
+            except TelegramRetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                self.stats.retried += 1
+                bucket = self._bucket(chat_id) or self._global
+                bucket.pause(e.retry_after)
+                await self._acquire(chat_id)
+
+    async def _run(self, chat_id: int | None, job: _Job, merge_key: Hashable | None) -> Any:
+        self.stats.queued += 1
+        self.stats.max_queued = max(self.stats.max_queued, self.stats.queued)
+        started = time.monotonic()
+        try:
+            await self._acquire(chat_id)
+        finally:
+            self.stats.queued -= 1
+            if merge_key is not None and self._pending.get(merge_key) is job:
+                del self._pending[merge_key]
+        self.stats.record_wait(time.monotonic() - started)
+        return await self._perform(chat_id, job)
+
+    async def submit(self, chat_id: int | None, call: ApiCall, *, merge_key: Hashable | None = None) -> Any:
+        self.stats.submitted += 1
+        job = self._pending.get(merge_key) if merge_key is not None else None
+        if job is not None:
+            job.call = call
+            self.stats.merged += 1
+        else:
+            job = _Job(call)
+            if merge_key is not None:
+                self._pending[merge_key] = job
+            job.task = asyncio.create_task(self._run(chat_id, job, merge_key))
+
+        # the job runs on its own, so a cancelled caller leaves it to the merged ones and only the last one stops it
+        job.waiters += 1
+        try:
+            return await asyncio.shield(job.task)
+        except asyncio.CancelledError:
+            if not job.task.done():
+                job.waiters -= 1
+                if job.waiters == 0:
+                    job.task.cancel()
+            raise
@@ -0,0 +1,82 @@
+import base64
+import dataclasses
+import json
+import pickle
+from typing import Any, Callable
+
+SNAPSHOT_VERSION = 1
+
+_JSON_SCALARS = (str, int, float, bool, type(None))
+_MISSING = object()
+_field_names: dict[type, tuple[str, ...]] = {}
+_codecs: dict[type, tuple[str, Callable[[Any], Any]]] = {}
+_decoders: dict[str, Callable[[Any], Any]] = {}
+
+
+def field_names(cls: type) -> tuple[str, ...]:
+    names = _field_names.get(cls)
+    if names is None:
+        names = tuple(f.name for f in dataclasses.fields(cls)) if dataclasses.is_dataclass(cls) else ()
+        _field_names[cls] = names
+    return names
+
+
+def register_codec(cls: type, token: str, encode: Callable[[Any], Any], decode: Callable[[Any], Any]):
+    _codecs[cls] = (token, encode)
+    _decoders[token] = decode
+
+
+def _plain_copy(value: Any) -> Any:
+    # returns an independent copy of JSON-compatible values, so snapshots never share lists or dicts with fields
+    if isinstance(value, _JSON_SCALARS):
+        return value
+    if isinstance(value, list):
+        items = [_plain_copy(item) for item in value]
+        return _MISSING if any(item is _MISSING for item in items) else items
+    if isinstance(value, dict):
+        if not all(isinstance(key, str) for key in value):
+            return _MISSING
+        items = {key: _plain_copy(item) for key, item in value.items()}
+        return _MISSING if any(item is _MISSING for item in items.values()) else items
+    return _MISSING
+
+
+def encode_fields(obj: object, *,
+                  allow_pickle: bool = True) -> tuple[dict[str, Any], dict[str, list], dict[str, str]]:
+    plain, coded, pickled = {}, {}, {}
+    for name in field_names(obj.__class__):
+        value = getattr(obj, name)
+        if (copied := _plain_copy(value)) is not _MISSING:
+            plain[name] = copied
+        elif (codec := _codecs.get(type(value))) is not None:
+            token, encode = codec
+            coded[name] = [token, encode(value)]
+        elif allow_pickle:
+            pickled[name] = base64.b85encode(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)).decode('ascii')
+        else:
+            raise TypeError(f'Field {name} of type {type(value).__name__} has no registered codec')
+    return plain, coded, pickled
+
+
+def decode_fields(obj: object, plain: dict[str, Any], coded: dict[str, list], pickled: dict[str, str], *,
+                  allow_pickle: bool = True):
+    known = field_names(obj.__class__)
+    for name, value in plain.items():
+        if name in known:
+            setattr(obj, name, _plain_copy(value))
+    for name, (token, value) in coded.items():
+        if name in known:
+            setattr(obj, name, _decoders[token](value))
+    if pickled and not allow_pickle:
+        raise TypeError(f'Snapshot of {obj.__class__.__name__} contains pickled fields, but unpickling is disabled')
+    for name, value in pickled.items():
+        if name in known:
+            setattr(obj, name, pickle.loads(base64.b85decode(value)))
+
+
+def pack(snapshot: dict[str, Any]) -> bytes:
+    return json.dumps(snapshot, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def unpack(data: bytes | str) -> dict[str, Any]:
+    return json.loads(data)
@@ -0,0 +1,122 @@
+from dataclasses import dataclass
+from typing import Any, Mapping
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State
+
+_MISSING = object()
+
+
+@dataclass
+class SessionStats:
+    reads: int = 0
+    writes: int = 0
+    requested: int = 0
+
+    @property
+    def saved(self) -> int:
+        return self.requested - self.reads - self.writes
+
+
+class FSMSession:
+    DATA_KEY = 'fsm_session'
+
+    stats = SessionStats()
+
+    def __init__(self, fsm: FSMContext, raw_state: Any = _MISSING):
+        self.fsm = fsm
+        self.local = SessionStats()
+
+        self._state: str | None = None if raw_state is _MISSING else raw_state
+        self._state_loaded = raw_state is not _MISSING
+        self._state_dirty = False
+
+        self._data: dict[str, Any] | None = None
+        self._pending: dict[str, Any] = {}
+
+    @classmethod
+    def of(cls, data: dict[str, Any]) -> 'FSMSession | None':
+        session = data.get(cls.DATA_KEY)
+        if session is None:
+            fsm: FSMContext | None = data.get('state')
+            if fsm is None:
+                return None
+            session = cls(fsm, data.get('raw_state', _MISSING))
+            data[cls.DATA_KEY] = session
+        return session
+
+    @property
+    def dirty(self) -> bool:
+        return self._state_dirty or len(self._pending) > 0
+
+    def _count(self, *, reads: int = 0, writes: int = 0, requested: int = 1):
+        for stats in (self.local, FSMSession.stats):
+            stats.reads += reads
+            stats.writes += writes
+            stats.requested += requested
+
+    async def get_state(self) -> str | None:
+        if self._state_loaded:
+            self._count()
+            return self._state
+        self._state = await self.fsm.get_state()
+        self._state_loaded = True
+        self._count(reads=1)
+        return self._state
+
+    async def set_state(self, state: State | str | None = None):
+        if isinstance(state, State):
+            state = state.state
+        self._count()
+        if self._state_loaded and self._state == state:
+            return
+        self._state = state
+        self._state_loaded = True
+        self._state_dirty = True
+
+    async def get_data(self) -> dict[str, Any]:
+        if self._data is None:
+            self._data = await self.fsm.get_data()
+            self._count(reads=1)
+        else:
+            self._count()
+        return self._data | self._pending
+
+    async def fetch_data(self) -> dict[str, Any]:
+        self._data = await self.fsm.get_data()
+        self._count(reads=1)
+        return self._data | self._pending
+
+    async def update_data(self, data: Mapping[str, Any] | None = None, **kwargs: Any):
+        if data:
+            kwargs.update(data)
+        self._count()
+        for key, value in kwargs.items():
+            if self._data is not None and self._data.get(key, _MISSING) == value:
+                continue
+            self._pending[key] = value
+
+    def refresh(self):
+        # drops what was read, changes made during this update are kept
+        self._data = None
+        if not self._state_dirty:
+            self._state_loaded = False
+
+    def discard(self):
+        self._data = None
+        self._pending = {}
+        self._state_loaded = False
+        self._state_dirty = False
+
+    async def commit(self):
+        if self._pending:
+            # only the keys changed by this update are written, so writes made meanwhile by others are kept
+            await self.fsm.update_data(self._pending)
+            if self._data is not None:
+                self._data.update(self._pending)
+            self._pending = {}
+            self._count(writes=1, requested=0)
+        if self._state_dirty:
+            await self.fsm.set_state(self._state)
+            self._state_dirty = False
+            self._count(writes=1, requested=0)
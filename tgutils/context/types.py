@@ -1,10 +1,14 @@
+import hashlib
+import json
 from dataclasses import dataclass
 from typing import Callable, Awaitable
 
-from aiogram.types import Message
+from aiogram.types import Message, TelegramObject
 from aiogram.utils.formatting import Text
 
-from tgutils.consts.aliases import Keyboard
+from tgutils.consts.aliases import Keyboard, Button
+
+Digest = tuple[int, int]
 
 
 @dataclass
@@ -18,6 +22,25 @@ class Response:
             return kwargs | self.text.as_kwargs()
         return kwargs | {'text': self.text}
 
+    def digest(self) -> Digest:
+        kwargs = self.as_kwargs()
+        markup = kwargs.pop('reply_markup')
+        markup_digest = 0 if markup is None else _digest(markup.model_dump_json(exclude_none=True))
+        return _digest(json.dumps(kwargs, sort_keys=True, default=_dump_object)), markup_digest
+
+
+def _dump_object(obj: object) -> object:
+    if isinstance(obj, TelegramObject):
+        return obj.model_dump(exclude_none=True)
+    return str(obj)
+
+
+def _digest(data: str) -> int:
+    return int.from_bytes(hashlib.blake2b(data.encode('utf-8'), digest_size=6).digest(), 'big')
+
 
 Handler = Callable[..., Awaitable[object]]
 Sender = Callable[..., Awaitable[Message]]
+KwargsBinder = Callable[[dict[str, object]], dict[str, object]]
+Rows = list[list[Button]]
+Fragment = Rows | Callable[[type], Rows]
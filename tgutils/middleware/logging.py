@@ -1,12 +1,23 @@
 import json
 import logging
+import queue
+import random
 import re
 import sys
-from typing import Callable, Dict, Any, Awaitable
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Collection, Dict, Any, Awaitable
 
 from aiogram import BaseMiddleware
-from aiogram.fsm.context import FSMContext
 from aiogram.types import TelegramObject
+from aiogram.types.update import UpdateTypeLookupError
+
+from ..context.session import FSMSession
+from ..utils.lru import LRUCache
+from ..utils.rate import TokenBucket
 
 sys.setrecursionlimit(1000)
 
@@ -26,22 +37,78 @@ DEFAULT_FIELD_RULES = {
 }
 
 
+DEFAULT_PATH_CACHE_SIZE = 4096
+DEFAULT_QUEUE_SIZE = 1024
+DEFAULT_TRACKED_CHATS = 4096
+DEFAULT_SUMMARY_INTERVAL = 60.0
+
+_DENIED = object()
+
+
+@dataclass
+class LoggingStats:
+    queued: int = 0
+    written: int = 0
+    dropped: int = 0
+    sampled_out: int = 0
+    rate_limited: int = 0
+    suppressed: Counter = field(default_factory=Counter)
+
+
 class LoggingMiddleware(BaseMiddleware):
-    def __init__(self, *, field_rules: dict[str, bool] | None = None, ensure_ascii: bool = False):
+    def __init__(self, *, field_rules: dict[str, bool] | None = None, ensure_ascii: bool = False,
+                 path_cache_size: int = DEFAULT_PATH_CACHE_SIZE, logger: logging.Logger | None = None,
+                 background: bool = True, queue_size: int = DEFAULT_QUEUE_SIZE, sample_rate: float = 1.0,
+                 type_rates: dict[str, float] | None = None, allowlist: Collection[int] = (),
+                 chat_rate: float | None = None, chat_burst: float | None = None,
+                 tracked_chats: int = DEFAULT_TRACKED_CHATS, summary_interval: float | None = DEFAULT_SUMMARY_INTERVAL,
+                 keep_none: bool = False, clock: Callable[[], float] = time.monotonic):
         super().__init__()
 
+        self.logger = logger if logger is not None else logging.getLogger()
+        self.stats = LoggingStats()
+
+        self.sample_rate = sample_rate
+        self.type_rates = type_rates or {}
+        self.allowlist = frozenset(allowlist)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.summary_interval = summary_interval
+
+        self._clock = clock
+        self._buckets: LRUCache[int, TokenBucket] = LRUCache(tracked_chats)
+        self._summarized_at = clock()
+
+        self._queue: queue.Queue | None = queue.Queue(queue_size) if background else None
+        self._worker: threading.Thread | None = None
+        # queued and written are also updated from the worker thread
+        self._stats_lock = threading.Lock()
+
         if field_rules is None:
             field_rules = DEFAULT_FIELD_RULES
         self.field_rules = {re.compile(pattern): verdict for pattern, verdict in field_rules.items()}
 
         self.ensure_ascii = ensure_ascii
+        # unset fields are left out as they always were, keep_none logs them as null
+        self.keep_none = keep_none
 
-    def _allow_path(self, path: str) -> bool:
+        self._path_cache_size = path_cache_size
+        self._decisions: dict[str, bool] = {}
+
+    def _match_path(self, path: str) -> bool:
         for pattern, verdict in self.field_rules.items():
-            if re.fullmatch(pattern, path):
+            if pattern.fullmatch(path):
                 return verdict
         return False
 
+    def _allow_path(self, path: str) -> bool:
+        verdict = self._decisions.get(path)
+        if verdict is None:
+            if len(self._decisions) >= self._path_cache_size:
+                self._decisions.clear()
+            verdict = self._decisions[path] = self._match_path(path)
+        return verdict
+
     def _ensure_str(self, s: Any) -> str:
         if not isinstance(s, str):
             s = str(s)
@@ -51,49 +118,145 @@ class LoggingMiddleware(BaseMiddleware):
 
     def _simplify_object(self, event: Any, path: str) -> Any:
         if not self._allow_path(path):
-            return None
+            return _DENIED
 
         try:
             if isinstance(event, TelegramObject):
-                event = event.model_dump()
+                # walk the model lazily instead of model_dump, so denied subtrees are never converted
+                result = {}
+                for key, value in event:
+                    if value is None and not self.keep_none:
+                        continue
+                    if (fmt := self._simplify_object(value, f'{path}.{key}')) is not _DENIED:
+                        result[self._ensure_str(key)] = fmt
+                return result
 
             if isinstance(event, list):
                 next_path = f'{path}[]'
                 result = []
                 for item in event:
-                    if (fmt := self._simplify_object(item, next_path)) is not None:
+                    if (fmt := self._simplify_object(item, next_path)) is not _DENIED:
                         result.append(fmt)
                 return result
 
             if isinstance(event, str):
                 return self._ensure_str(event)
 
+            if isinstance(event, datetime):
+                # the same unix timestamp model_dump gives for aiogram dates
+                return int(event.timestamp())
+
             if hasattr(event, '__dict__'):
                 event = event.__dict__
 
             if isinstance(event, dict):
                 result = {}
                 for key, value in event.items():
-                    if (fmt := self._simplify_object(value, f'{path}.{key}')) is not None:
+                    if value is None and not self.keep_none:
+                        continue
+                    if (fmt := self._simplify_object(value, f'{path}.{key}')) is not _DENIED:
                         result[self._ensure_str(key)] = fmt
                 return result
 
             return event
-        except ValueError | AttributeError:
+        except (ValueError, AttributeError):
             return '<<NON-MARSHALLING>>'
 
+    @staticmethod
+    def _event_type(event: TelegramObject) -> str:
+        try:
+            return event.event_type
+        except (AttributeError, UpdateTypeLookupError):
+            return type(event).__name__
+
+    def _chat_allowed(self, chat_id: int) -> bool:
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst, clock=self._clock)
+            self._buckets.put(chat_id, bucket)
+        return bucket.try_acquire()
+
+    def _select(self, event: TelegramObject, data: Dict[str, Any]) -> bool:
+        chat = data.get('event_chat')
+        if chat is not None and chat.id in self.allowlist:
+            return True
+
+        event_type = self._event_type(event)
+        rate = self.type_rates.get(event_type, self.sample_rate)
+        if rate < 1.0 and random.random() >= rate:
+            self.stats.sampled_out += 1
+            self.stats.suppressed[event_type] += 1
+            return False
+
+        if self.chat_rate is not None and chat is not None and not self._chat_allowed(chat.id):
+            self.stats.rate_limited += 1
+            self.stats.suppressed[event_type] += 1
+            return False
+        return True
+
+    def _summarize(self):
+        now = self._clock()
+        if self.summary_interval is None or now - self._summarized_at < self.summary_interval:
+            return
+        if self.stats.suppressed:
+            details = ', '.join(f'{event_type}: {count}' for event_type, count in self.stats.suppressed.most_common())
+            self.logger.info(f'Suppressed {self.stats.suppressed.total()} updates in the last '
+                             f'{now - self._summarized_at:.0f}s ({details})')
+            self.stats.suppressed.clear()
+        self._summarized_at = now
+
+    def _write(self, event: TelegramObject, state: str | None):
+        simplified = self._simplify_object(event, '')
+        event_data = json.dumps(simplified if simplified is not _DENIED else None, ensure_ascii=False,
+                                separators=(',', ':'), default=str)
+        self.logger.debug(f'Event: {event_data}')
+        self.logger.debug(f'State: {state}')
+        with self._stats_lock:
+            self.stats.written += 1
+
+    def _drain(self):
+        while (record := self._queue.get()) is not None:
+            with self._stats_lock:
+                self.stats.queued -= 1
+            try:
+                self._write(*record)
+            except Exception as e:
+                self.logger.warning(f'Failed to log event: {e}')
+
+    def _submit(self, event: TelegramObject, state: str | None):
+        if self._queue is None:
+            return self._write(event, state)
+
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._drain, name='logging-middleware', daemon=True)
+            self._worker.start()
+        try:
+            # counted before the put, the worker may take the record before this thread continues
+            with self._stats_lock:
+                self.stats.queued += 1
+            self._queue.put_nowait((event, state))
+        except queue.Full:
+            with self._stats_lock:
+                self.stats.queued -= 1
+            self.stats.dropped += 1
+
+    def close(self):
+        if self._worker is not None and self._worker.is_alive():
+            self._queue.put(None)
+            self._worker.join()
+        self._worker = None
+
     async def __call__(
             self,
             handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
             event: TelegramObject,
             data: Dict[str, Any]
     ) -> Any:
-        event_data = json.dumps(self._simplify_object(event, ''), ensure_ascii=False, indent=2)
-        logging.debug(f'Event: {event_data}')
-
-        context: FSMContext | None = data.get('state')
-        if context is not None:
-            state = await context.get_state()
-            logging.debug(f'State: {state}')
+        if self.logger.isEnabledFor(logging.DEBUG) and self._select(event, data):
+            session = FSMSession.of(data)
+            state = await session.get_state() if session is not None else None
+            self._submit(event, state)
+        if self.summary_interval is not None:
+            self._summarize()
 
         return await handler(event, data)
@@ -0,0 +1,72 @@
+import time
+from typing import Any, Awaitable, Callable, Dict, Mapping
+
+from aiogram import BaseMiddleware
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.types import TelegramObject
+
+from ..context.metrics import ContextMetrics
+from ..context.session import FSMSession
+
+
+def _handler_name(data: Dict[str, Any]) -> str:
+    handler = data.get('handler')
+    if handler is None:
+        # outer middlewares run before a handler is chosen, every update would end up under one label
+        raise RuntimeError('MetricsMiddleware needs the matched handler, register it as an inner middleware, '
+                           'e.g. router.message.middleware(MetricsMiddleware(metrics))')
+    callback = handler.callback
+    return getattr(callback, '__qualname__', None) or repr(callback)
+
+
+class MetricsMiddleware(BaseMiddleware):
+    def __init__(self, metrics: ContextMetrics):
+        super().__init__()
+        self.metrics = metrics
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        name = _handler_name(data)
+        session = FSMSession.of(data)
+        state = await session.get_state() if session is not None else None
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            self.metrics.handlers.observe(time.perf_counter() - started, handler=name, state=state)
+
+    def instrument(self, storage: BaseStorage) -> 'InstrumentedStorage':
+        return InstrumentedStorage(storage, self.metrics)
+
+
+class InstrumentedStorage(BaseStorage):
+    def __init__(self, storage: BaseStorage, metrics: ContextMetrics):
+        self.storage = storage
+        self.metrics = metrics
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        with self.metrics.storage.time(operation='set_state'):
+            return await self.storage.set_state(key, state)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        with self.metrics.storage.time(operation='get_state'):
+            return await self.storage.get_state(key)
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        with self.metrics.storage.time(operation='set_data'):
+            return await self.storage.set_data(key, data)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        with self.metrics.storage.time(operation='get_data'):
+            return await self.storage.get_data(key)
+
+    async def update_data(self, key: StorageKey, data: Mapping[str, Any]) -> Dict[str, Any]:
+        with self.metrics.storage.time(operation='update_data'):
+            return await self.storage.update_data(key, data)
+
+    async def close(self) -> None:
+        await self.storage.close()
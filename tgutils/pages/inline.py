@@ -0,0 +1,90 @@
+import asyncio
+import inspect
+import time
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Generic, Sequence, TypeVar
+
+from aiogram.types import InlineQuery, InlineQueryResult
+
+from ..utils.lru import LRUCache
+
+MAX_INLINE_RESULTS = 50
+DEFAULT_INLINE_PAGE = 20
+DEFAULT_CACHED_QUERIES = 256
+DEFAULT_QUERY_TTL = 60.0
+
+InlineItem = TypeVar('InlineItem')
+
+
+class InlineQueryPaginator(ABC, Generic[InlineItem]):
+    def __init__(self, page_size: int = DEFAULT_INLINE_PAGE, *, cached_queries: int = DEFAULT_CACHED_QUERIES,
+                 query_ttl: float | None = DEFAULT_QUERY_TTL, clock: Callable[[], float] = time.monotonic):
+        self.page_size = min(page_size, MAX_INLINE_RESULTS)
+        self._results: LRUCache[str, Sequence[InlineItem]] = LRUCache(cached_queries, query_ttl, clock=clock)
+        self._pending: dict[str, asyncio.Future] = {}
+
+    @property
+    def stats(self):
+        return self._results.stats
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return ' '.join(query.casefold().split())
+
+    @staticmethod
+    def _parse_offset(offset: str) -> int:
+        try:
+            return max(0, int(offset))
+        except ValueError:
+            return 0
+
+    @abstractmethod
+    def resolve(self, query: str) -> Sequence[InlineItem] | Awaitable[Sequence[InlineItem]]:
+        pass
+
+    @abstractmethod
+    def make_result(self, item: InlineItem, position: int) -> InlineQueryResult:
+        pass
+
+    async def items(self, query: str) -> Sequence[InlineItem]:
+        query = self.normalize(query)
+        items = self._results.get(query)
+        if items is not None:
+            return items
+
+        # identical queries arriving while the first one resolves share its result
+        pending = self._pending.get(query)
+        if pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # the first caller was cancelled, the waiters resolve the query again unless cancelled themselves
+                if not pending.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                return await self.items(query)
+
+        future = self._pending[query] = asyncio.get_running_loop().create_future()
+        try:
+            items = self.resolve(query)
+            if inspect.isawaitable(items):
+                items = await items
+            self._results.put(query, items)
+            future.set_result(items)
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            del self._pending[query]
+            if not future.done():
+                future.cancel()
+        return await future
+
+    async def page(self, query: str, offset: str = '') -> tuple[list[InlineQueryResult], str]:
+        items = await self.items(query)
+        start = self._parse_offset(offset)
+        stop = min(start + self.page_size, len(items))
+        results = [self.make_result(items[position], position) for position in range(start, stop)]
+        return results, str(stop) if stop < len(items) else ''
+
+    async def answer(self, inline_query: InlineQuery, **kwargs) -> bool:
+        results, next_offset = await self.page(inline_query.query, inline_query.offset)
+        return await inline_query.answer(results, next_offset=next_offset, **kwargs)
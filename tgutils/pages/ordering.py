@@ -0,0 +1,105 @@
+from array import array
+from typing import Any, Callable, Generic, Sequence, TypeVar, overload
+
+OrderedItem = TypeVar('OrderedItem')
+SortKey = Callable[[Any], Any]
+
+_orders: dict[str, 'SortOrders'] = {}
+
+
+class SortOrders(Generic[OrderedItem]):
+    def __init__(self, items: Sequence[OrderedItem], keys: dict[str, SortKey]):
+        self.items = items
+        self.keys = keys
+
+        self._permutations: dict[str, array] = {}
+        self._size = len(items)
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def invalidate(self):
+        self._permutations.clear()
+        self._size = len(self.items)
+        self.version += 1
+
+    def permutation(self, name: str) -> array:
+        if len(self.items) != self._size:
+            self.invalidate()
+        permutation = self._permutations.get(name)
+        if permutation is None:
+            key, items = self.keys[name], self.items
+            permutation = array('I', sorted(range(len(items)), key=lambda position: key(items[position])))
+            self._permutations[name] = permutation
+        return permutation
+
+    def view(self, name: str, reverse: bool = False, token: str = '') -> 'OrderedView[OrderedItem]':
+        if name not in self.keys:
+            raise KeyError(f'Unknown sort order {name!r}')
+        return OrderedView(self, name, reverse, token)
+
+
+def register_orders(token: str, orders: SortOrders) -> SortOrders:
+    _orders[token] = orders
+    return orders
+
+
+def get_orders(token: str) -> SortOrders:
+    orders = _orders.get(token)
+    if orders is None:
+        raise KeyError(f'No sort orders registered for token {token!r}')
+    return orders
+
+
+class OrderedView(Sequence[OrderedItem], Generic[OrderedItem]):
+    def __init__(self, orders: SortOrders[OrderedItem], name: str, reverse: bool = False, token: str = ''):
+        self.token = token
+        self.name = name
+        self.reverse = reverse
+        self._orders = orders
+
+    def __getstate__(self) -> dict[str, object]:
+        if not self.token:
+            raise TypeError('Only views of registered sort orders can be pickled')
+        return {'token': self.token, 'name': self.name, 'reverse': self.reverse}
+
+    def __setstate__(self, state: dict[str, object]):
+        self.__init__(get_orders(state['token']), state['name'], state['reverse'], state['token'])
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, OrderedView):
+            return NotImplemented
+        return (self._orders, self.name, self.reverse) == (other._orders, other.name, other.reverse)
+
+    @property
+    def orders(self) -> SortOrders[OrderedItem]:
+        return self._orders
+
+    @property
+    def version(self) -> int:
+        return self._orders.version
+
+    def __len__(self) -> int:
+        return len(self._orders.items)
+
+    @overload
+    def __getitem__(self, index: int) -> OrderedItem:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Sequence[OrderedItem]:
+        ...
+
+    def __getitem__(self, index: int | slice) -> OrderedItem | Sequence[OrderedItem]:
+        permutation, items = self._orders.permutation(self.name), self._orders.items
+        if isinstance(index, slice):
+            positions = range(len(permutation))[index]
+            if self.reverse:
+                return [items[permutation[-1 - position]] for position in positions]
+            return [items[permutation[position]] for position in positions]
+        if index < 0:
+            index += len(permutation)
+        if not 0 <= index < len(permutation):
+            raise IndexError(index)
+        return items[permutation[-1 - index if self.reverse else index]]
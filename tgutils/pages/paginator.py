@@ -1,18 +1,29 @@
+import random
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import Type, TypeVar, Generic
+from typing import Type, TypeVar, Generic, Iterable
 
+from aiogram.filters import Filter, or_f
 from aiogram.filters.callback_data import CallbackData
 from aiogram.types import CallbackQuery
 
 from ..consts.aliases import Button, KeyboardBuilder
-from ..consts.buttons import DISABLED, PAGE_UP, PAGE_DOWN, PAGE_LEFT, PAGE_RIGHT, STUB
+from ..consts.buttons import DISABLED, PAGE_UP, PAGE_DOWN, PAGE_LEFT, PAGE_RIGHT, STUB, PAGE_FIRST, PAGE_LAST, \
+    PAGE_BACKWARD, PAGE_FORWARD
+from ..utils.lru import LRUCache
+from .ordering import SortOrders, OrderedView, get_orders
+from .search import SearchIndex, FilteredView, get_index
+from .windowed import WindowedItems, DEFAULT_CACHED_WINDOWS
 
 DEFAULT_MAX_ROWS = 8
 DEFAULT_ROW_ITEMS = 1
+DEFAULT_CACHED_PAGES = 16
 
 _paginator_callbacks: dict[str, Type[CallbackData]] = {}
+_jump_callbacks: dict[str, Type[CallbackData]] = {}
+_packed_callbacks: dict[tuple[str, int], str] = {}
 PaginatorType = TypeVar('PaginatorType')
+Rows = list[list[Button]]
 
 @dataclass
 class Paginator(ABC, Generic[PaginatorType]):
@@ -22,6 +33,12 @@ class Paginator(ABC, Generic[PaginatorType]):
     _max_rows: int = DEFAULT_MAX_ROWS
     _row_items: int = DEFAULT_ROW_ITEMS
 
+    _version = 0
+    _cached_pages = DEFAULT_CACHED_PAGES
+
+    stateless = False
+    token = ''
+
     @classmethod
     def callback(cls) -> Type[CallbackData]:
         name = f'{cls.__name__.lower()}'
@@ -34,14 +51,127 @@ class Paginator(ABC, Generic[PaginatorType]):
         _paginator_callbacks[name] = PaginatorCallback
         return PaginatorCallback
 
+    @classmethod
+    def _packed(cls, delta: int) -> str:
+        key = (cls.__name__, delta)
+        packed = _packed_callbacks.get(key)
+        if packed is None:
+            packed = _packed_callbacks[key] = cls.callback()(delta=delta).pack()
+        return packed
+
+    @classmethod
+    def jump_callback(cls) -> Type[CallbackData]:
+        name = f'{cls.__name__.lower()}@'
+        if name in _jump_callbacks:
+            return _jump_callbacks[name]
+
+        class PaginatorJumpCallback(CallbackData, prefix=name):
+            offset: int
+            token: str = ''
+
+        _jump_callbacks[name] = PaginatorJumpCallback
+        return PaginatorJumpCallback
+
+    @classmethod
+    def navigation_filter(cls) -> Filter:
+        return or_f(cls.callback().filter(), cls.jump_callback().filter())
+
+    @classmethod
+    def target(cls, query: CallbackQuery) -> tuple[int, str]:
+        data = cls.jump_callback().unpack(query.data)
+        return data.offset, data.token
+
+    def _jump(self, offset: int) -> str:
+        return self.jump_callback()(offset=offset, token=self.token).pack()
+
+    def _nav(self, delta: int) -> str:
+        if self.stateless:
+            return self._jump(self._offset + delta)
+        return self._packed(delta)
+
     def advance(self, query: CallbackQuery):
+        if query.data.startswith(self.jump_callback().__prefix__ + ':'):
+            self._offset = max(0, self.target(query)[0])
+            return
         data = self.callback().unpack(query.data)
         self._offset += data.delta
 
+    @property
     @abstractmethod
-    def to_builder(self, keyboard: KeyboardBuilder):
+    def _page_capacity(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def _last_offset(self) -> int:
+        pass
+
+    def _count_label(self, count: int) -> str:
+        return f'({count})'
+
+    def jump_buttons(self, pages: Iterable[int] = (-5, 5), *, edges: bool = True) -> list[Button]:
+        last = self._last_offset
+        buttons = []
+        if edges:
+            buttons.append(Button(text=PAGE_FIRST, callback_data=self._jump(0)))
+        for page in pages:
+            offset = min(max(self._offset + page * self._page_capacity, 0), last)
+            text = f'{PAGE_BACKWARD if page < 0 else PAGE_FORWARD} {abs(page)}'
+            buttons.append(Button(text=text, callback_data=self._jump(offset)))
+        if edges:
+            buttons.append(Button(text=PAGE_LAST, callback_data=self._jump(last)))
+        return buttons
+
+    def __setattr__(self, name: str, value: object):
+        if name == 'items':
+            # a replaced list may get the id of the previous one, so every assignment starts a new version,
+            # a random one keeps it distinct from paginators of other contexts in the shared response cache
+            self.__dict__['_version'] = random.getrandbits(32)
+        super().__setattr__(name, value)
+
+    def __getstate__(self) -> dict[str, object]:
+        state = self.__dict__.copy()
+        state.pop('_render_cache', None)
+        return state
+
+    @property
+    def _render_cache(self) -> LRUCache[tuple, Rows]:
+        # lives with this instance and isn't pickled, so it only pays off for a paginator rendered more than once,
+        # e.g. a context kept alive by ContextCache instead of restored from the storage on every update
+        cache = self.__dict__.get('_render_cache')
+        if cache is None:
+            cache = self.__dict__['_render_cache'] = LRUCache(self._cached_pages)
+        return cache
+
+    @property
+    def _items_version(self) -> tuple:
+        return len(self.items), getattr(self.items, 'version', 0), self._version
+
+    def render_key(self) -> tuple:
+        # subclasses whose make_button reads more than the item (selection marks etc.) add that state here
+        return ()
+
+    @property
+    def memo_key(self) -> tuple:
+        return type(self), self._offset, self._items_version, self.render_key()
+
+    def invalidate(self):
+        self._version += 1
+        self._render_cache.clear()
+
+    @abstractmethod
+    def _build_rows(self) -> Rows:
         pass
 
+    def to_builder(self, keyboard: KeyboardBuilder):
+        key = (self._offset, self._items_version, self.render_key())
+        rows = self._render_cache.get(key)
+        if rows is None:
+            rows = self._build_rows()
+            self._render_cache.put(key, rows)
+        for row in rows:
+            keyboard.row(*row)
+
     @abstractmethod
     def make_button(self, item: PaginatorType) -> Button:
         pass
@@ -62,6 +192,15 @@ class VerticalPaginator(Paginator[PaginatorType], ABC):
     def _content_rows(self) -> int:
         return self._max_rows - 2
 
+    @property
+    def _page_capacity(self) -> int:
+        return self._content_rows * self._row_items
+
+    @property
+    def _last_offset(self) -> int:
+        rows_left = -(-(len(self.items) - self._page_capacity) // self._row_items)
+        return max(0, rows_left) * self._row_items
+
     @property
     def _up_enabled(self) -> bool:
         return self._offset > 0
@@ -71,12 +210,11 @@ class VerticalPaginator(Paginator[PaginatorType], ABC):
         items_fit = self._offset + self._content_rows * self._row_items
         return items_fit < len(self.items)
 
-    def to_builder(self, keyboard: KeyboardBuilder):
+    def _build_rows(self) -> Rows:
+        rows = []
         if self._up_enabled:
-            keyboard.row(Button(
-                text=f'{PAGE_UP} ({self._offset})',
-                callback_data=self.callback()(delta=-self._row_items).pack()
-            ))
+            up = f'{PAGE_UP} {self._count_label(self._offset)}'
+            rows.append([Button(text=up, callback_data=self._nav(-self._row_items))])
 
         used_items = 0
         for row in range(self._content_rows):
@@ -92,14 +230,13 @@ class VerticalPaginator(Paginator[PaginatorType], ABC):
                 elif self.stub_incomplete_row:
                     buttons.append(self._STUB_BUTTON)
 
-            keyboard.row(*buttons)
+            rows.append(buttons)
 
         if self._down_enabled:
             remaining = len(self.items) - self._offset - used_items
-            keyboard.row(Button(
-                text=f'{PAGE_DOWN} ({remaining})',
-                callback_data=self.callback()(delta=self._row_items).pack()
-            ))
+            down = f'{PAGE_DOWN} {self._count_label(remaining)}'
+            rows.append([Button(text=down, callback_data=self._nav(self._row_items))])
+        return rows
 
 
 class HorizontalPaginator(Paginator[PaginatorType], ABC):
@@ -114,6 +251,14 @@ class HorizontalPaginator(Paginator[PaginatorType], ABC):
     def _page_size(self) -> int:
         return self._max_rows - 1
 
+    @property
+    def _page_capacity(self) -> int:
+        return self._page_size
+
+    @property
+    def _last_offset(self) -> int:
+        return max(0, (len(self.items) - 1) // self._page_size * self._page_size)
+
     @property
     def _left_enabled(self) -> bool:
         return self._offset > 0
@@ -122,24 +267,113 @@ class HorizontalPaginator(Paginator[PaginatorType], ABC):
     def _right_enabled(self):
         return self._offset + self._page_size < len(self.items)
 
-    def to_builder(self, keyboard: KeyboardBuilder):
+    def _disabled_button(self) -> Button:
+        return Button(text=DISABLED, callback_data=self._nav(0))
+
+    def _build_rows(self) -> Rows:
         page_size = self._page_size
-        for item in self.items[self._offset:self._offset + page_size]:
-            keyboard.row(self.make_button(item))
-
-        left = (self._offset + page_size - 1) // page_size
-        right = (len(self.items) - self._offset - 1) // page_size
-        row = [
-            Button(text=f'{PAGE_LEFT} ({left})', callback_data=self.callback()(delta=-page_size).pack()),
-            Button(text=f'{PAGE_RIGHT} ({right})', callback_data=self.callback()(delta=page_size).pack())
-        ]
-        has_sides = 2
-        if not self._left_enabled:
-            row[0] = Button(text=DISABLED, callback_data=self.callback()(delta=0).pack())
-            has_sides -= 1
-        if not self._right_enabled:
-            row[1] = Button(text=DISABLED, callback_data=self.callback()(delta=0).pack())
-            has_sides -= 1
-
-        if has_sides > 0:
-            keyboard.row(*row)
+        rows = [[self.make_button(item)] for item in self.items[self._offset:self._offset + page_size]]
+
+        row = [self._disabled_button(), self._disabled_button()]
+        if self._left_enabled:
+            left = (self._offset + page_size - 1) // page_size
+            row[0] = Button(text=f'{PAGE_LEFT} {self._count_label(left)}', callback_data=self._nav(-page_size))
+        if self._right_enabled:
+            right = (len(self.items) - self._offset - 1) // page_size
+            row[1] = Button(text=f'{PAGE_RIGHT} {self._count_label(right)}', callback_data=self._nav(page_size))
+
+        if self._left_enabled or self._right_enabled:
+            rows.append(row)
+        return rows
+
+
+class AsyncPaginator(Paginator[PaginatorType], ABC):
+    items: WindowedItems[PaginatorType]
+
+    @property
+    def token(self) -> str:
+        return self.items.token
+
+    async def load(self):
+        await self.items.load(self._offset, self._page_capacity)
+
+    async def before_render(self):
+        await self.load()
+
+
+class AsyncVerticalPaginator(AsyncPaginator[PaginatorType], VerticalPaginator[PaginatorType], ABC):
+    def __init__(self, max_rows: int, row_items: int, source_token: str, stub_incomplete_row: bool = True, *,
+                 prefetch: bool = True, cached_windows: int = DEFAULT_CACHED_WINDOWS):
+        items = WindowedItems(source_token, prefetch=prefetch, cached_windows=cached_windows)
+        super().__init__(max_rows, row_items, items, stub_incomplete_row)
+
+
+class AsyncHorizontalPaginator(AsyncPaginator[PaginatorType], HorizontalPaginator[PaginatorType], ABC):
+    def __init__(self, max_rows: int, source_token: str, *,
+                 prefetch: bool = True, cached_windows: int = DEFAULT_CACHED_WINDOWS):
+        items = WindowedItems(source_token, prefetch=prefetch, cached_windows=cached_windows)
+        super().__init__(max_rows, items)
+
+
+class SearchablePaginator(Paginator[PaginatorType], ABC):
+    items: FilteredView[PaginatorType]
+
+    @staticmethod
+    def _view(index: SearchIndex[PaginatorType] | str, query: str) -> FilteredView[PaginatorType]:
+        if isinstance(index, str):
+            return get_index(index).search(query, index)
+        return index.search(query)
+
+    @property
+    def query(self) -> str:
+        return self.items.query
+
+    def search(self, query: str):
+        self.items = self.items.index.search(query, self.items.token)
+        self._offset = 0
+
+    def _count_label(self, count: int) -> str:
+        if self.items.filtered:
+            return f'({count}/{len(self.items)})'
+        return super()._count_label(count)
+
+
+class SearchableVerticalPaginator(SearchablePaginator[PaginatorType], VerticalPaginator[PaginatorType], ABC):
+    def __init__(self, max_rows: int, row_items: int, index: SearchIndex[PaginatorType] | str, query: str = '',
+                 stub_incomplete_row: bool = True):
+        super().__init__(max_rows, row_items, self._view(index, query), stub_incomplete_row)
+
+
+class SearchableHorizontalPaginator(SearchablePaginator[PaginatorType], HorizontalPaginator[PaginatorType], ABC):
+    def __init__(self, max_rows: int, index: SearchIndex[PaginatorType] | str, query: str = ''):
+        super().__init__(max_rows, self._view(index, query))
+
+
+class SortablePaginator(Paginator[PaginatorType], ABC):
+    items: OrderedView[PaginatorType]
+
+    @staticmethod
+    def _view(orders: SortOrders[PaginatorType] | str, order: str, reverse: bool) -> OrderedView[PaginatorType]:
+        if isinstance(orders, str):
+            return get_orders(orders).view(order, reverse, orders)
+        return orders.view(order, reverse)
+
+    @property
+    def order(self) -> tuple[str, bool]:
+        return self.items.name, self.items.reverse
+
+    def sort_by(self, order: str, reverse: bool = False):
+        if (order, reverse) != self.order:
+            self.items = self.items.orders.view(order, reverse, self.items.token)
+            self._offset = 0
+
+
+class SortableVerticalPaginator(SortablePaginator[PaginatorType], VerticalPaginator[PaginatorType], ABC):
+    def __init__(self, max_rows: int, row_items: int, orders: SortOrders[PaginatorType] | str, order: str,
+                 reverse: bool = False, stub_incomplete_row: bool = True):
+        super().__init__(max_rows, row_items, self._view(orders, order, reverse), stub_incomplete_row)
+
+
+class SortableHorizontalPaginator(SortablePaginator[PaginatorType], HorizontalPaginator[PaginatorType], ABC):
+    def __init__(self, max_rows: int, orders: SortOrders[PaginatorType] | str, order: str, reverse: bool = False):
+        super().__init__(max_rows, self._view(orders, order, reverse))
@@ -0,0 +1,167 @@
+import re
+from array import array
+from bisect import bisect_left
+from typing import Callable, Generic, Sequence, TypeVar, overload
+
+from ..utils.lru import LRUCache
+
+DEFAULT_CACHED_QUERIES = 256
+
+SearchItem = TypeVar('SearchItem')
+
+_WORD = re.compile(r'\w+')
+_indices: dict[str, 'SearchIndex'] = {}
+
+
+def tokenize(text: str) -> list[str]:
+    return _WORD.findall(text.casefold())
+
+
+def _intersect(left: array, right: array) -> array:
+    if len(left) > len(right):
+        left, right = right, left
+    present = set(right)
+    return array('I', (index for index in left if index in present))
+
+
+class SearchIndex(Generic[SearchItem]):
+    def __init__(self, items: list[SearchItem], key: Callable[[SearchItem], str], *,
+                 cached_queries: int = DEFAULT_CACHED_QUERIES):
+        self.items = items
+        self.key = key
+        self.version = 0
+
+        self._postings: dict[str, array] = {}
+        self._tokens: list[str] = []
+        self._indexed = 0
+        self._queries: LRUCache[str, array] = LRUCache(cached_queries)
+        self.refresh()
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _index(self, position: int, item: SearchItem):
+        for token in set(tokenize(self.key(item))):
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = array('I')
+                self._tokens.append(token)
+            postings.append(position)
+
+    def refresh(self):
+        if self._indexed == len(self.items):
+            return
+        known = len(self._tokens)
+        for position in range(self._indexed, len(self.items)):
+            self._index(position, self.items[position])
+        self._indexed = len(self.items)
+        if len(self._tokens) != known:
+            self._tokens.sort()
+        self._queries.clear()
+        self.version += 1
+
+    def add(self, item: SearchItem):
+        self.items.append(item)
+        self.refresh()
+
+    def _prefix_matches(self, prefix: str) -> array:
+        start = bisect_left(self._tokens, prefix)
+        matched = []
+        for token in self._tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            matched.append(self._postings[token])
+        if len(matched) == 1:
+            return matched[0]
+        return array('I', sorted({index for postings in matched for index in postings}))
+
+    def search_indices(self, query: str) -> array | None:
+        tokens = tokenize(query)
+        if not tokens:
+            return None
+        normalized = ' '.join(tokens)
+        result = self._queries.get(normalized)
+        if result is None:
+            for token in sorted(set(tokens), key=len, reverse=True):
+                matches = self._prefix_matches(token)
+                result = matches if result is None else _intersect(result, matches)
+                if not result:
+                    break
+            self._queries.put(normalized, result)
+        return result
+
+    def search(self, query: str, token: str = '') -> 'FilteredView[SearchItem]':
+        return FilteredView(self, query, token)
+
+
+def register_index(token: str, index: SearchIndex) -> SearchIndex:
+    _indices[token] = index
+    return index
+
+
+def get_index(token: str) -> SearchIndex:
+    index = _indices.get(token)
+    if index is None:
+        raise KeyError(f'No search index registered for token {token!r}')
+    return index
+
+
+class FilteredView(Sequence[SearchItem], Generic[SearchItem]):
+    def __init__(self, index: SearchIndex[SearchItem], query: str, token: str = ''):
+        self.token = token
+        self.query = query
+        self._index = index
+        self._positions: array | None = None
+        self._seen_version = -1
+
+    def __getstate__(self) -> dict[str, object]:
+        if not self.token:
+            raise TypeError('Only views of registered search indices can be pickled')
+        return {'token': self.token, 'query': self.query}
+
+    def __setstate__(self, state: dict[str, object]):
+        self.__init__(get_index(state['token']), state['query'], state['token'])
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, FilteredView):
+            return NotImplemented
+        return self._index is other._index and self.query == other.query
+
+    @property
+    def index(self) -> SearchIndex[SearchItem]:
+        return self._index
+
+    @property
+    def version(self) -> int:
+        return self._index.version
+
+    @property
+    def filtered(self) -> bool:
+        return self.positions is not None
+
+    @property
+    def positions(self) -> array | None:
+        if self._seen_version != self._index.version:
+            self._positions = self._index.search_indices(self.query)
+            self._seen_version = self._index.version
+        return self._positions
+
+    def __len__(self) -> int:
+        positions = self.positions
+        return len(self._index.items) if positions is None else len(positions)
+
+    @overload
+    def __getitem__(self, index: int) -> SearchItem:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Sequence[SearchItem]:
+        ...
+
+    def __getitem__(self, index: int | slice) -> SearchItem | Sequence[SearchItem]:
+        positions, items = self.positions, self._index.items
+        if positions is None:
+            return items[index]
+        if isinstance(index, slice):
+            return [items[position] for position in positions[index]]
+        return items[positions[index]]
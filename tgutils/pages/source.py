@@ -0,0 +1,37 @@
+from typing import Protocol, Sequence, TypeVar, runtime_checkable
+
+SourceItem = TypeVar('SourceItem', covariant=True)
+
+_sources: dict[str, 'ItemSource'] = {}
+
+
+@runtime_checkable
+class ItemSource(Protocol[SourceItem]):
+    async def count(self) -> int:
+        ...
+
+    async def fetch(self, offset: int, limit: int) -> Sequence[SourceItem]:
+        ...
+
+
+class ListSource(ItemSource[SourceItem]):
+    def __init__(self, items: Sequence[SourceItem]):
+        self.items = items
+
+    async def count(self) -> int:
+        return len(self.items)
+
+    async def fetch(self, offset: int, limit: int) -> Sequence[SourceItem]:
+        return self.items[offset:offset + limit]
+
+
+def register_source(token: str, source: ItemSource) -> ItemSource:
+    _sources[token] = source
+    return source
+
+
+def get_source(token: str) -> ItemSource:
+    source = _sources.get(token)
+    if source is None:
+        raise KeyError(f'No item source registered for token {token!r}')
+    return source
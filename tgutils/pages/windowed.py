@@ -0,0 +1,97 @@
+from typing import Generic, Sequence, TypeVar, overload
+
+from .source import ItemSource, get_source
+
+DEFAULT_CACHED_WINDOWS = 4
+
+WindowItem = TypeVar('WindowItem')
+
+
+class WindowNotLoadedError(LookupError):
+    def __init__(self, index: int):
+        super().__init__(f'Item {index} is outside of the loaded windows, call load() first')
+
+
+class WindowedItems(Sequence[WindowItem], Generic[WindowItem]):
+    def __init__(self, token: str, *, prefetch: bool = True, cached_windows: int = DEFAULT_CACHED_WINDOWS):
+        self.token = token
+        self.prefetch = prefetch
+        self.cached_windows = cached_windows
+
+        self.version = 0
+        self._count: int | None = None
+        self._windows: list[tuple[int, Sequence[WindowItem]]] = []
+
+    def __getstate__(self) -> dict[str, object]:
+        return {'token': self.token, 'prefetch': self.prefetch, 'cached_windows': self.cached_windows}
+
+    def __setstate__(self, state: dict[str, object]):
+        self.__init__(state['token'], prefetch=state['prefetch'], cached_windows=state['cached_windows'])
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, WindowedItems):
+            return NotImplemented
+        return self.__getstate__() == other.__getstate__()
+
+    @property
+    def source(self) -> ItemSource[WindowItem]:
+        return get_source(self.token)
+
+    def invalidate(self):
+        self.version += 1
+        self._count = None
+        self._windows.clear()
+
+    def _find(self, start: int, stop: int) -> tuple[int, Sequence[WindowItem]] | None:
+        for position, (window_start, window) in enumerate(self._windows):
+            if window_start <= start and stop <= window_start + len(window):
+                if position > 0:
+                    self._windows.insert(0, self._windows.pop(position))
+                return window_start, window
+        return None
+
+    async def load(self, offset: int, limit: int):
+        source = self.source
+        if self._count is None:
+            self._count = await source.count()
+
+        offset = max(0, min(offset, self._count))
+        stop = min(offset + limit, self._count)
+        if self._find(offset, stop) is not None:
+            return
+
+        size = limit * 2 if self.prefetch else limit
+        self._windows.insert(0, (offset, await source.fetch(offset, size)))
+        del self._windows[self.cached_windows:]
+
+    def __len__(self) -> int:
+        if self._count is None:
+            raise WindowNotLoadedError(0)
+        return self._count
+
+    @overload
+    def __getitem__(self, index: int) -> WindowItem:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Sequence[WindowItem]:
+        ...
+
+    def __getitem__(self, index: int | slice) -> WindowItem | Sequence[WindowItem]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if start >= stop:
+                return []
+            found = self._find(start, stop)
+            if found is None:
+                raise WindowNotLoadedError(start)
+            window_start, window = found
+            return window[start - window_start:stop - window_start:step]
+
+        if index < 0:
+            index += len(self)
+        found = self._find(index, index + 1)
+        if found is None:
+            raise WindowNotLoadedError(index)
+        window_start, window = found
+        return window[index - window_start]
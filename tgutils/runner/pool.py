@@ -0,0 +1,207 @@
+import asyncio
+import inspect
+import logging
+import multiprocessing
+import queue
+import time
+from dataclasses import dataclass
+from multiprocessing.process import BaseProcess
+from typing import Any, AsyncIterable, Awaitable, Callable
+
+from aiogram import Bot, Dispatcher
+
+DEFAULT_QUEUE_SIZE = 1024
+DEFAULT_IN_FLIGHT = 256
+DEFAULT_PENDING = 1024
+
+RawUpdate = dict[str, Any]
+WorkerFactory = Callable[[], tuple[Dispatcher, Bot] | Awaitable[tuple[Dispatcher, Bot]]]
+
+_CHAT_EVENTS = ('message', 'edited_message', 'channel_post', 'edited_channel_post', 'business_message',
+                'edited_business_message', 'my_chat_member', 'chat_member', 'chat_join_request', 'chat_boost',
+                'removed_chat_boost', 'message_reaction', 'message_reaction_count')
+_USER_EVENTS = ('callback_query', 'inline_query', 'chosen_inline_result', 'shipping_query', 'pre_checkout_query',
+                'poll_answer')
+_MIX = 0x9E3779B97F4A7C15
+_MASK = (1 << 64) - 1
+
+
+def chat_of(update: RawUpdate) -> int:
+    for name in _CHAT_EVENTS:
+        event = update.get(name)
+        if event is not None and 'chat' in event:
+            return event['chat']['id']
+    for name in _USER_EVENTS:
+        event = update.get(name)
+        if event is None:
+            continue
+        message = event.get('message')
+        if message is not None and 'chat' in message:
+            return message['chat']['id']
+        user = event.get('from') or event.get('user')
+        if user is not None:
+            return user['id']
+    return update.get('update_id', 0)
+
+
+def shard_of(chat_id: int, workers: int) -> int:
+    # sequential user ids and negative group ids are mixed first, so they spread evenly
+    return (((chat_id * _MIX) & _MASK) >> 32) % workers
+
+
+async def _serve(factory: WorkerFactory, updates: multiprocessing.Queue, processed, in_flight: int, pending: int):
+    created = factory()
+    if inspect.isawaitable(created):
+        created = await created
+    dispatcher, bot = created
+    loop = asyncio.get_running_loop()
+    budget = asyncio.Semaphore(in_flight)
+    backlog = asyncio.Semaphore(pending)
+    tails: dict[int, asyncio.Task] = {}
+
+    async def handle(previous: asyncio.Task | None, update: RawUpdate):
+        try:
+            if previous is not None:
+                await asyncio.wait((previous,))
+            # taken only when it's this chat's turn, so updates queued behind a busy chat don't hold it
+            async with budget:
+                await dispatcher.feed_raw_update(bot, update)
+        except Exception as e:
+            logging.exception(f'Failed to process update {update.get("update_id")}: {e}')
+        finally:
+            backlog.release()
+            with processed.get_lock():
+                processed.value += 1
+
+    def release(chat_id: int, task: asyncio.Task):
+        if tails.get(chat_id) is task:
+            del tails[chat_id]
+
+    await dispatcher.emit_startup(bot=bot, dispatcher=dispatcher)
+    try:
+        while True:
+            await backlog.acquire()
+            item = await loop.run_in_executor(None, updates.get)
+            if item is None:
+                break
+            chat_id, update = item
+            # updates of one chat run one after another, other chats are processed concurrently
+            task = tails[chat_id] = asyncio.create_task(handle(tails.get(chat_id), update))
+            task.add_done_callback(lambda done, chat=chat_id: release(chat, done))
+        if tails:
+            await asyncio.wait(tails.values())
+    finally:
+        await dispatcher.emit_shutdown(bot=bot, dispatcher=dispatcher)
+        await bot.session.close()
+
+
+def _worker_main(factory: WorkerFactory, updates: multiprocessing.Queue, processed, in_flight: int, pending: int):
+    asyncio.run(_serve(factory, updates, processed, in_flight, pending))
+
+
+@dataclass
+class WorkerStats:
+    dispatched: int = 0
+    processed: int = 0
+    blocked: int = 0
+    blocked_seconds: float = 0.0
+    restarts: int = 0
+
+    @property
+    def backlog(self) -> int:
+        return self.dispatched - self.processed
+
+
+class _Worker:
+    def __init__(self, index: int, updates: multiprocessing.Queue, processed):
+        self.index = index
+        self.updates = updates
+        self.processed = processed
+        self.process: BaseProcess | None = None
+        self.stats = WorkerStats()
+        self.restarting = False
+
+
+class WorkerPool:
+    def __init__(self, factory: WorkerFactory, workers: int = 2, *, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 in_flight: int = DEFAULT_IN_FLIGHT, pending: int = DEFAULT_PENDING, start_method: str | None = None):
+        if workers <= 0:
+            raise ValueError('Worker pool needs at least one worker')
+        self.factory = factory
+        self.in_flight = in_flight
+        self.pending = max(pending, in_flight)
+
+        self._mp = multiprocessing.get_context(start_method)
+        self._workers = [
+            _Worker(index, self._mp.Queue(queue_size), self._mp.Value('Q', 0)) for index in range(workers)
+        ]
+
+    def __len__(self) -> int:
+        return len(self._workers)
+
+    @property
+    def stats(self) -> list[WorkerStats]:
+        for worker in self._workers:
+            worker.stats.processed = worker.processed.value
+        return [worker.stats for worker in self._workers]
+
+    def _spawn(self, worker: _Worker):
+        worker.process = self._mp.Process(
+            target=_worker_main, args=(self.factory, worker.updates, worker.processed, self.in_flight, self.pending),
+            name=f'tgutils-worker-{worker.index}', daemon=True,
+        )
+        worker.process.start()
+
+    def start(self):
+        for worker in self._workers:
+            if worker.process is None:
+                self._spawn(worker)
+
+    async def _put(self, worker: _Worker, item: tuple[int, RawUpdate] | None):
+        try:
+            worker.updates.put_nowait(item)
+        except queue.Full:
+            worker.stats.blocked += 1
+            started = time.perf_counter()
+            await asyncio.get_running_loop().run_in_executor(None, worker.updates.put, item)
+            worker.stats.blocked_seconds += time.perf_counter() - started
+
+    async def dispatch(self, update: RawUpdate):
+        chat_id = chat_of(update)
+        worker = self._workers[shard_of(chat_id, len(self._workers))]
+        if worker.process is not None and not worker.process.is_alive() and not worker.restarting:
+            logging.warning(f'Worker {worker.index} exited with code {worker.process.exitcode}, restarting')
+            worker.stats.restarts += 1
+            self._spawn(worker)
+        await self._put(worker, (chat_id, update))
+        worker.stats.dispatched += 1
+
+    async def _drain(self, worker: _Worker):
+        await self._put(worker, None)
+        await asyncio.get_running_loop().run_in_executor(None, worker.process.join)
+
+    async def restart(self, index: int):
+        worker = self._workers[index]
+        if worker.restarting:
+            return
+        worker.restarting = True
+        try:
+            # updates queued after the sentinel stay in the queue and are picked up by the new process
+            await self._drain(worker)
+            worker.stats.restarts += 1
+            self._spawn(worker)
+        finally:
+            worker.restarting = False
+
+    async def stop(self):
+        await asyncio.gather(*(self._drain(worker) for worker in self._workers if worker.process is not None))
+        for worker in self._workers:
+            worker.process = None
+
+    async def run(self, source: AsyncIterable[RawUpdate]):
+        self.start()
+        try:
+            async for update in source:
+                await self.dispatch(update)
+        finally:
+            await self.stop()
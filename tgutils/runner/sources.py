@@ -0,0 +1,79 @@
+import asyncio
+import hmac
+import logging
+from typing import AsyncIterator
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramNetworkError, TelegramServerError, TelegramRetryAfter
+from aiohttp import web
+
+from .pool import RawUpdate
+
+DEFAULT_POLLING_TIMEOUT = 30
+DEFAULT_WEBHOOK_QUEUE = 1024
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+class PollingSource:
+    def __init__(self, bot: Bot, *, timeout: int = DEFAULT_POLLING_TIMEOUT, limit: int = 100,
+                 allowed_updates: list[str] | None = None, backoff: float = 1.0):
+        self.bot = bot
+        self.timeout = timeout
+        self.limit = limit
+        self.allowed_updates = allowed_updates
+        self.backoff = backoff
+
+    def __aiter__(self) -> AsyncIterator[RawUpdate]:
+        return self._poll()
+
+    async def _poll(self) -> AsyncIterator[RawUpdate]:
+        offset = None
+        while True:
+            try:
+                updates = await self.bot.get_updates(offset=offset, timeout=self.timeout, limit=self.limit,
+                                                     allowed_updates=self.allowed_updates)
+            except TelegramRetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+                continue
+            except (TelegramNetworkError, TelegramServerError) as e:
+                logging.warning(f'Failed to fetch updates: {e}')
+                await asyncio.sleep(self.backoff)
+                continue
+            for update in updates:
+                offset = update.update_id + 1
+                yield update.model_dump(mode='json', by_alias=True, exclude_none=True)
+
+
+class WebhookSource:
+    def __init__(self, host: str = '127.0.0.1', port: int = 8080, path: str = '/webhook', *,
+                 secret_token: str | None = None, queue_size: int = DEFAULT_WEBHOOK_QUEUE):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+        self.queue_size = queue_size
+
+    def __aiter__(self) -> AsyncIterator[RawUpdate]:
+        return self._serve()
+
+    async def _serve(self) -> AsyncIterator[RawUpdate]:
+        updates: asyncio.Queue[RawUpdate] = asyncio.Queue(self.queue_size)
+
+        async def receive(request: web.Request) -> web.Response:
+            if self.secret_token is not None and \
+                    not hmac.compare_digest(request.headers.get(SECRET_HEADER, ''), self.secret_token):
+                return web.Response(status=401)
+            # a full queue delays the reply, so Telegram slows down instead of the runner buffering without bound
+            await updates.put(await request.json())
+            return web.Response()
+
+        app = web.Application()
+        app.router.add_post(self.path, receive)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, self.host, self.port).start()
+        try:
+            while True:
+                yield await updates.get()
+        finally:
+            await runner.cleanup()
@@ -0,0 +1,37 @@
+import asyncio
+import logging
+from typing import Iterable
+
+import aiogram.exceptions as tg_exc
+from aiogram import Bot
+
+DELETE_MESSAGES_LIMIT = 100
+DEFAULT_DELETE_CONCURRENCY = 8
+
+
+async def _delete_one(bot: Bot, chat_id: int, message_id: int, semaphore: asyncio.Semaphore) -> bool:
+    async with semaphore:
+        try:
+            return await bot.delete_message(chat_id, message_id)
+        except tg_exc.TelegramBadRequest as e:
+            logging.info(f'Bad request trying to delete message {message_id}: {e}')
+            return False
+
+
+async def delete_messages(bot: Bot, chat_id: int, message_ids: Iterable[int], *,
+                          concurrency: int = DEFAULT_DELETE_CONCURRENCY) -> int:
+    message_ids = list(dict.fromkeys(message_ids))
+    fallback = []
+    for start in range(0, len(message_ids), DELETE_MESSAGES_LIMIT):
+        chunk = message_ids[start:start + DELETE_MESSAGES_LIMIT]
+        try:
+            await bot.delete_messages(chat_id, chunk)
+        except tg_exc.TelegramBadRequest as e:
+            logging.info(f'Bulk delete failed, deleting {len(chunk)} messages one by one: {e}')
+            fallback.extend(chunk)
+
+    if not fallback:
+        return len(message_ids)
+    semaphore = asyncio.Semaphore(concurrency)
+    deleted = await asyncio.gather(*(_delete_one(bot, chat_id, message_id, semaphore) for message_id in fallback))
+    return len(message_ids) - len(fallback) + sum(map(bool, deleted))
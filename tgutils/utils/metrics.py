@@ -0,0 +1,190 @@
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Iterator
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = tuple[str, ...]
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    kind = ''
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...]):
+        self.name = name
+        self.description = description
+        self.labels = labels
+
+    def _key(self, labels: dict[str, object]) -> LabelValues:
+        if len(labels) != len(self.labels):
+            raise ValueError(f'Metric {self.name} expects labels {self.labels}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labels)
+
+    @abstractmethod
+    def _samples(self) -> Iterator[str]:
+        pass
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} {self.kind}', *self._samples()]
+        return '\n'.join(lines)
+
+    def _labels(self, key: LabelValues) -> dict[str, str]:
+        return dict(zip(self.labels, key))
+
+    @abstractmethod
+    def snapshot(self) -> list[dict[str, object]]:
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, description, labels)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: object):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: object) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            yield f'{self.name}{_format_labels(self.labels, key)} {_format_number(value)}'
+
+    def snapshot(self) -> list[dict[str, object]]:
+        return [{'labels': self._labels(key), 'value': value} for key, value in self._values.items()]
+
+    def clear(self):
+        self._values.clear()
+
+
+class _Series:
+    __slots__ = ('buckets', 'count', 'sum')
+
+    def __init__(self, size: int):
+        self.buckets = [0] * size
+        self.count = 0
+        self.sum = 0.0
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[LabelValues, _Series] = {}
+
+    def observe(self, value: float, **labels: object):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series(len(self.buckets) + 1)
+        series.buckets[bisect_left(self.buckets, value)] += 1
+        series.count += 1
+        series.sum += value
+
+    @contextmanager
+    def time(self, **labels: object):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: object) -> int:
+        series = self._series.get(self._key(labels))
+        return 0 if series is None else series.count
+
+    def _samples(self) -> Iterator[str]:
+        for key, series in self._series.items():
+            cumulative = 0
+            for bound, hits in zip((*self.buckets, float('inf')), series.buckets):
+                cumulative += hits
+                labels = _format_labels(self.labels, key, f'le="{_format_number(bound)}"')
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = _format_labels(self.labels, key)
+            yield f'{self.name}_sum{labels} {_format_number(series.sum)}'
+            yield f'{self.name}_count{labels} {series.count}'
+
+    def snapshot(self) -> list[dict[str, object]]:
+        return [
+            {
+                'labels': self._labels(key),
+                'count': series.count,
+                'sum': series.sum,
+                'buckets': {_format_number(bound): hits
+                            for bound, hits in zip((*self.buckets, float('inf')), series.buckets)},
+            }
+            for key, series in self._series.items()
+        ]
+
+    def clear(self):
+        self._series.clear()
+
+
+class MetricsRegistry:
+    def __init__(self, namespace: str = ''):
+        self.namespace = namespace
+        self._metrics: dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric) or existing.labels != metric.labels:
+                raise ValueError(f'Metric {metric.name} is already registered with a different definition')
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def _full_name(self, name: str) -> str:
+        return f'{self.namespace}_{name}' if self.namespace else name
+
+    def counter(self, name: str, description: str, labels: tuple[str, ...] = ()) -> Counter:
+        # noinspection PyTypeChecker
+        return self._register(Counter(self._full_name(name), description, labels))
+
+    def histogram(self, name: str, description: str, labels: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        # noinspection PyTypeChecker
+        return self._register(Histogram(self._full_name(name), description, labels, buckets))
+
+    def get(self, name: str) -> _Metric | None:
+        return self._metrics.get(self._full_name(name))
+
+    def render(self) -> str:
+        return ''.join(metric.render() + '\n' for metric in self._metrics.values())
+
+    def snapshot(self) -> dict[str, list[dict[str, object]]]:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def clear(self):
+        for metric in self._metrics.values():
+            metric.clear()
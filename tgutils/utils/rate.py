@@ -0,0 +1,53 @@
+import asyncio
+import time
+from typing import Callable
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float | None = None, *, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0:
+            raise ValueError('Token bucket rate should be positive')
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def idle(self) -> bool:
+        now = self._clock()
+        self._refill(now)
+        return self._tokens >= self.capacity and now >= self._paused_until and not self._lock.locked()
+
+    def delay(self, tokens: float = 1.0) -> float:
+        now = self._clock()
+        self._refill(now)
+        paused = max(0.0, self._paused_until - now)
+        if self._tokens >= tokens:
+            return paused
+        return max(paused, (tokens - self._tokens) / self.rate)
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        if self.delay(tokens) > 0:
+            return False
+        self._tokens -= tokens
+        return True
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        waited = 0.0
+        async with self._lock:
+            while (delay := self.delay(tokens)) > 0:
+                waited += delay
+                await asyncio.sleep(delay)
+            self._tokens -= tokens
+        return waited
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, self._clock() + seconds)